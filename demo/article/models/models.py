@@ -1,7 +1,7 @@
 from django.contrib.auth.models import User
 from django.db import models
 
-from signoffs.models import Signet, SignoffSet, SignoffSingle
+from signoffs.models import Signet, SignoffCounter, SignoffSet, SignoffSingle
 from signoffs.signoffs import SignoffRenderer, SignoffUrlsManager, SimpleSignoff
 from .signets import LikeSignet
 from ..signoffs import publication_approval_signoff, publication_request_signoff
@@ -33,9 +33,9 @@ class Article(models.Model):
         "like_signoff",
         signet_set_accessor="like_signatories",
     )
-    total_likes = models.IntegerField(
-        default=0
-    )  # storing total_likes is faster than counting LikeSignets at runtime
+    total_likes = SignoffCounter(
+        "like_signoff"
+    )  # storing total_likes is faster than counting LikeSignets at runtime - maintained by the signoffs API
 
     def update_publication_status(self):
         status = self.PublicationStatus.NOT_REQUESTED
@@ -62,10 +62,6 @@ class Article(models.Model):
         #     self.publish_signet.delete()  # Delete the signet associated with the article
         super().delete(*args, **kwargs)  # Delete the article itself
 
-    # def save(module, *args, **kwargs):
-    #     module.total_likes = module.likes.count()  # redundancy to force total_likes to stay accurate
-    #     super().save(*args, **kwargs)
-
     def is_author(self, user=None, username=None):
         if user is None and username is None:
             raise ValueError("Either user or username must be provided.")
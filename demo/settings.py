@@ -45,6 +45,7 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "signoffs.permissions.PermissionCacheMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 
     "django_htmx.middleware.HtmxMiddleware",
@@ -17,3 +17,15 @@ class SignoffsConfig(AppConfig):
             from django.utils.module_loading import autodiscover_modules
 
             autodiscover_modules(settings.SIGNOFFS_AUTODISCOVER_MODULE)
+
+        from signoffs import registry
+
+        registry.signoffs.freeze()
+        registry.approvals.freeze()
+
+        if settings.SIGNOFFS_WARM_UP_SIGNING_ORDERS:
+            from signoffs.core.signing_order.signing_order import (
+                warm_up_signing_orders,
+            )
+
+            warm_up_signing_orders()
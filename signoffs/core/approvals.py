@@ -17,10 +17,11 @@ from django.core.exceptions import ImproperlyConfigured, PermissionDenied
 from django.db import transaction
 from django.utils.text import slugify
 
-from signoffs.core import utils
+from signoffs.core import permissions, utils
 from signoffs.core.models import managers
 from signoffs.core.renderers import ApprovalRenderer
 from signoffs.core.signing_order import SigningOrder
+from signoffs.core.signoffs import revoke_signoff
 from signoffs.core.status import ApprovalStatus
 from signoffs.core.urls import ApprovalUrlsManager
 from signoffs.core.models import AbstractApprovalStamp
@@ -49,13 +50,21 @@ def revoke_approval(approval: AbstractApproval, user, reason: str = "") -> None:
 
     Default implementation revokes ALL related signets on behalf of the user
       - a user with permission to revoke an approval DOES NOT NEED permission to revoke all signoffs within!
+    Signets are revoked in bulk, with a constant number of queries - see `SignetQuerySet.revoke`
+      - except signoffs with a custom revoke_method, which are revoked one at a time, in reverse order.
     """
     with transaction.atomic():
         # First mark approval as no longer approved, b/c signoffs can't be revoked from approved approval
         approval.stamp.approved = False
-        # Revoke all signoffs in reverse order
-        for signoff in reversed(approval.signatories.signoffs()):
+        signoffs = approval.signatories.signoffs(subject=approval)
+        custom = [s for s in signoffs if s.logic.revoke_method is not revoke_signoff]
+        for signoff in reversed(custom):
             signoff.revoke(user=user, reason=reason)
+        approval.signatories.exclude(pk__in=[s.signet.pk for s in custom]).revoke(
+            user, reason, notify=False
+        )
+        if signoffs:  # one notification, rather than one per signoff, keeps signing order state in sync
+            approval.signoff_revoked(signoffs[-1])
 
         approval.save()
 
@@ -147,7 +156,7 @@ class DefaultApprovalBusinessLogic:
         return (
             False
             if self.revoke_perm is False
-            else user.has_perm(revoke_perm)
+            else permissions.has_perm(user, revoke_perm)
             if revoke_perm
             else True
         )
@@ -527,6 +536,18 @@ class AbstractApproval:
         """
         return bool(self.signing_order and self.signing_order.is_complete())
 
+    def signoff_signed(self, signoff):
+        """Hook called by the signoffs API after a signoff on this approval is signed - see `AbstractApprovalStamp.signoff_signed`"""
+        hook = getattr(self.signing_order, "signoff_signed", None)
+        if hook:
+            hook(signoff)
+
+    def signoff_revoked(self, signoff):
+        """Hook called by the signoffs API after a signoff on this approval is revoked - see `AbstractApprovalStamp.signoff_revoked`"""
+        hook = getattr(self.signing_order, "signoff_revoked", None)
+        if hook:
+            hook(signoff)
+
     def next_signoff_types(self, for_user=None):
         """
         Return list of next signoff type(s) (Signoff Type) required in this approval process.
@@ -535,6 +556,9 @@ class AbstractApproval:
         Concrete Approval Types can override this with custom business logic to provide signing order automation.
         """
         signoff_types = self.signing_order.next_signoffs() if self.signing_order else []
+        cache = permissions.get_permission_cache()
+        if for_user is not None and cache is not None:  # check perms for all candidate types in one batch
+            cache.has_perms(for_user, [t.logic.perm for t in signoff_types if t.logic.perm])
         return [
             signoff
             for signoff in signoff_types
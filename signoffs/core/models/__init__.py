@@ -1,2 +1,8 @@
+from .counters import SignoffCounter, is_counted, update_signoff_counters
+from .readonly import ApprovalView, SignoffView
 from .signets import AbstractRevokedSignet, AbstractSignet
-from .stamps import AbstractApprovalSignet, AbstractApprovalStamp
+from .stamps import (
+    AbstractApprovalSignet,
+    AbstractApprovalStamp,
+    SigningOrderStateMixin,
+)
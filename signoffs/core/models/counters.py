@@ -0,0 +1,165 @@
+"""
+A `SignoffCounter` is a denormalized count of the signoffs of one type related to a model instance (the "subject").
+
+Counting signets at runtime, e.g., to display the number of "likes" on a list of articles, gets expensive.
+A SignoffCounter field stores that count on the subject, and the signoffs API keeps it up-to-date:
+    the counter is updated atomically, with an F-expression, whenever a signoff of its type is signed
+    (`signoff.save()`, whatever the Type's sign_method, `SignoffSetManager.create`, bulk signing) or revoked (`revoke_signoff`, bulk revoke)
+    - revoking a signoff that was already revoked does not change the count.
+The counter is maintained by the library - saving the subject never overwrites it, so a stale in-memory value is
+    harmless (use `refresh_from_db(fields=[...])` to read the current value).
+Signets created or deleted by other means are not counted - use the `signoffs_reconcile_counters` command
+    (or `SignoffCounter.reconcile`) to recompute counters in bulk.
+"""
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+if TYPE_CHECKING:
+    from signoffs.core.signoffs import AbstractSignoff
+
+signoff_counters = defaultdict(list)
+"""Map of signoff id to list of SignoffCounter fields that count signoffs of that type"""
+
+
+class SignoffCounter(models.IntegerField):
+    """
+    A model field with the number of signed, un-revoked signoffs of the given type whose signet relates to the instance.
+    The signoff_type's signet model must have a FK to the model defining the counter, named by signet_relation,
+        which defaults to the signet model's only FK to that model.
+
+    In the example::
+
+        class LikeSignet(Signet):
+            article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='like_signatories')
+
+        class Article(models.Model):
+            likes = SignoffSet('like_signoff', signet_set_accessor='like_signatories')
+            total_likes = SignoffCounter('like_signoff')
+
+    ``Article().likes.create(user=user)`` adds 1 to ``total_likes`` in the DB, revoking that signoff subtracts 1.
+    """
+
+    description = "Number of signoffs"
+
+    def __init__(self, signoff_type: str | type[AbstractSignoff] = None, signet_relation=None, *args, **kwargs):
+        """Count signoffs of given Signoff Type (or signoff id), related to the instance by signet_relation FK"""
+        self.signoff_id = getattr(signoff_type, "id", signoff_type)
+        self.signet_relation = signet_relation
+        kwargs.setdefault("default", 0)
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["signoff_type"] = self.signoff_id
+        if self.signet_relation:
+            kwargs["signet_relation"] = self.signet_relation
+        if kwargs.get("default") == 0:
+            del kwargs["default"]
+        if kwargs.pop("editable", True):  # editable=False is the default for counters
+            kwargs["editable"] = True
+        return name, path, args, kwargs
+
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super().contribute_to_class(cls, name, *args, **kwargs)
+        # historical models built by migrations use their own app registry and must not be counted.
+        if not cls._meta.abstract and cls._meta.apps is apps:
+            signoff_counters[self.signoff_id].append(self)
+
+    def pre_save(self, model_instance, add):
+        """Saving an existing instance never overwrites the counter, which is only updated via F-expressions"""
+        if add:
+            return super().pre_save(model_instance, add)
+        return F(self.attname)
+
+    @cached_property
+    def signoff_type(self) -> type[AbstractSignoff]:
+        """Lazy evaluation for signoff_type to allow all signoffs to register before resolving."""
+        from signoffs import registry
+
+        return registry.get_signoff_type(self.signoff_id)
+
+    @cached_property
+    def signet_field(self) -> models.ForeignKey:
+        """The FK field on the Signet model that relates signets to the model defining this counter"""
+        signet_model = self.signoff_type.get_signetModel()
+        if self.signet_relation:
+            return signet_model._meta.get_field(self.signet_relation)
+        relations = signet_model.get_object_relations(self.model)
+        if len(relations) != 1:
+            raise ImproperlyConfigured(
+                f"SignoffCounter {self.model.__name__}.{self.name}: Signet model {signet_model.__name__} must have "
+                f"exactly one relation to {self.model.__name__}, or the signet_relation must be specified."
+            )
+        return relations[0]
+
+    def update(self, subject_ids, delta):
+        """Atomically add delta to this counter on the instances with given pk's - returns number of rows updated"""
+        return self.model._base_manager.filter(pk__in=subject_ids).update(
+            **{self.attname: F(self.attname) + delta}
+        )
+
+    def count_queryset(self):
+        """Return a queryset of the counted signets"""
+        return self.signoff_type.get_signet_queryset().active()
+
+    def reconcile(self, queryset=None):
+        """
+        Recompute this counter from the signets, for every instance in queryset (default: all), in one query.
+        Returns number of rows updated.
+        """
+        queryset = self.model._base_manager.all() if queryset is None else queryset
+        counts = (
+            self.count_queryset()
+            .filter(**{self.signet_field.attname: OuterRef("pk")})
+            .order_by()
+            .values(self.signet_field.attname)
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return queryset.update(**{self.attname: Coalesce(Subquery(counts), 0)})
+
+
+def is_counted(signet) -> bool:
+    """Return True iff some SignoffCounter counts signoffs of the given signet's type"""
+    return signet.signoff_id in signoff_counters
+
+
+def update_signoff_counters(signets, delta):
+    """Atomically add delta to every counter for each of the given signets - one query per counter per distinct count"""
+    for signoff_id, signoff_signets in _group_by_signoff_id(signets).items():
+        for counter in signoff_counters.get(signoff_id, ()):
+            subject_ids = Counter(
+                getattr(signet, counter.signet_field.attname) for signet in signoff_signets
+            )
+            subject_ids.pop(None, None)
+            by_count = defaultdict(list)
+            for subject_id, n in subject_ids.items():
+                by_count[n].append(subject_id)
+            for n, ids in by_count.items():
+                counter.update(ids, delta * n)
+
+
+def _group_by_signoff_id(signets):
+    """Return dict of signoff_id: list of signets, for signets with a counted signoff type"""
+    groups = defaultdict(list)
+    for signet in signets:
+        if is_counted(signet):
+            groups[signet.signoff_id].append(signet)
+    return groups
+
+
+__all__ = [
+    "SignoffCounter",
+    "is_counted",
+    "update_signoff_counters",
+]
@@ -3,6 +3,8 @@
 """
 from signoffs import registry
 
+from .counters import update_signoff_counters
+
 
 class QuerySetApiMixin:
     """
@@ -47,6 +49,11 @@ class SignetSetApiMixin(QuerySetApiMixin):
     def qs(self):
         return self.signet_set
 
+    def all(self):
+        """Return the signets in this set, each flagged if revoked (see with_revoked_flag), unless already fetched"""
+        qs = super().all()
+        return qs if qs._result_cache is not None else qs.with_revoked_flag()
+
 
 class SignoffSetManager(SignetSetApiMixin):
     """
@@ -87,11 +94,36 @@ class SignoffSetManager(SignetSetApiMixin):
 
     def create(self, user, **kwargs):
         """Create and return a new Signoff in this set"""
+        from signoffs.core.signoffs import notify_signet
+
         self._pre_save_owner()
         signet = self.signet_set.create(
             signoff_id=self.signoff_type.id, user=user, **kwargs
         )
-        return self.signoff_type(signet)
+        signoff = self.signoff_type(signet)
+        update_signoff_counters([signet], 1)
+        notify_signet(signoff, "signoff_signed")
+        return signoff
+
+    def bulk_create(self, users_or_signets, batch_size=None, **kwargs):
+        """
+        Create and return a list of new Signoffs in this set, one signed for each of the given users (or signets)
+        Permission is checked once per user, and signets are written with bulk_create - see AbstractSignoff.bulk_sign
+        """
+        self._pre_save_owner()
+        relation = getattr(self.signet_set, "field", None)  # a related manager's FK relation to its owner
+        if relation is not None:
+            users_or_signets = list(users_or_signets)
+            kwargs[relation.name] = self.signet_set.instance
+            for signet in users_or_signets:
+                if isinstance(signet, self.signoff_type.get_signetModel()):
+                    setattr(signet, relation.name, self.signet_set.instance)
+        return self.signoff_type.bulk_sign(
+            users_or_signets,
+            batch_size=batch_size,
+            signet_manager=self.signet_set,
+            **kwargs,
+        )
 
     # signoff delegate / aggregate methods
 
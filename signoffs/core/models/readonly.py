@@ -0,0 +1,165 @@
+"""
+Lightweight, read-only views of Signets and Stamps, for rendering long lists of signoffs and approvals
+
+A view is built directly from a `values()` row, so it carries only the few fields a listing needs,
+    in `__slots__`, without a model instance, Signoff / Approval instance, or any of their service objects.
+Views expose the same read accessors as Signoffs and Approvals - e.g., `is_signed`, `sigil`, `timestamp`.
+See `SignetQuerySet.signoff_views()` and `ApprovalStampQuerySet.approval_views()`
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+
+if TYPE_CHECKING:
+    from signoffs.core.approvals import AbstractApproval
+    from signoffs.core.signoffs import AbstractSignoff
+
+
+class SignoffView:
+    """A read-only view of one signet's signoff, built from a values() row"""
+
+    fields = ("id", "signoff_id", "user_id", "sigil", "sigil_label", "timestamp")
+    __slots__ = ("id", "signoff_id", "user_id", "_sigil", "_sigil_label", "timestamp", "revoked")
+
+    def __init__(
+        self,
+        id=None,
+        signoff_id=None,
+        user_id=None,
+        sigil=None,
+        sigil_label=None,
+        timestamp=None,
+        revoked=None,
+    ):
+        self.id = id
+        self.signoff_id = signoff_id
+        self.user_id = user_id
+        self._sigil = sigil
+        self._sigil_label = sigil_label
+        self.timestamp = timestamp
+        self.revoked = revoked  # pk of revoke receipt, if any
+
+    @classmethod
+    def from_row(cls, row: dict) -> SignoffView:
+        """Return a view for the given values() row, with keys from cls.fields, and optionally "revoked" """
+        return cls(**row)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"{type(self).__name__} is read-only")
+        super().__setattr__(name, value)
+
+    def __repr__(self):
+        return f"<{type(self).__name__}: {self.signoff_id} {self.id}>"
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, SignoffView)
+            and self.id == other.id
+            and self.signoff_id == other.signoff_id
+        )
+
+    def __hash__(self):
+        return hash((self.id, self.signoff_id))
+
+    @property
+    def signoff_type(self) -> type[AbstractSignoff]:
+        """Return the Signoff Type (class) for this signoff"""
+        from signoffs.registry import signoffs
+
+        return signoffs.get(self.signoff_id)
+
+    def is_signed(self) -> bool:
+        """return True if this signoff has been signed but not revoked"""
+        return self.id is not None and not self.is_revoked()
+
+    def is_revoked(self) -> bool:
+        """return True if this signoff has been revoked"""
+        return self.revoked is not None
+
+    @property
+    def sigil(self):
+        """Return the "sigil" on this signoff if it is signed, None otherwise"""
+        return self._sigil if self.is_signed() else None
+
+    @property
+    def sigil_label(self):
+        """Return a label for the "sigil" on this signoff, if it is signed, None otherwise"""
+        return self._sigil_label if self.is_signed() else None
+
+    @property
+    def signatory(self):
+        """
+        Return the user who signed, or AnonymousUser if signed but no signatory, None if not yet signed
+        Costs a query - listings should prefer `sigil` or `user_id`
+        """
+        if not self.is_signed():
+            return None
+        if self.user_id is None:
+            return AnonymousUser()
+        return get_user_model()._default_manager.get(pk=self.user_id)
+
+    def get_signoff(self) -> AbstractSignoff:
+        """Return the full Signoff instance for this view - costs a query"""
+        return self.signoff_type.get_signetModel().all_signets.get(pk=self.id).signoff
+
+
+class ApprovalView:
+    """A read-only view of one stamp's approval, built from a values() row"""
+
+    fields = ("id", "approval_id", "approved", "timestamp")
+    __slots__ = fields
+
+    def __init__(self, id=None, approval_id=None, approved=False, timestamp=None):
+        self.id = id
+        self.approval_id = approval_id
+        self.approved = approved
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_row(cls, row: dict) -> ApprovalView:
+        """Return a view for the given values() row, with keys from cls.fields"""
+        return cls(**row)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"{type(self).__name__} is read-only")
+        super().__setattr__(name, value)
+
+    def __repr__(self):
+        return f"<{type(self).__name__}: {self.approval_id} {self.id}>"
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ApprovalView)
+            and self.id == other.id
+            and self.approval_id == other.approval_id
+        )
+
+    def __hash__(self):
+        return hash((self.id, self.approval_id))
+
+    @property
+    def approval_type(self) -> type[AbstractApproval]:
+        """Return the Approval Type (class) for this approval"""
+        from signoffs.registry import approvals
+
+        return approvals.get(self.approval_id)
+
+    def is_approved(self) -> bool:
+        """return True if this approval is approved and has a persistent representation in DB"""
+        return self.approved and self.id is not None
+
+    def get_approval(self, subject=None) -> AbstractApproval:
+        """Return the full Approval instance for this view - costs a query"""
+        stamp = self.approval_type.get_stampModel().objects.get(pk=self.id)
+        return stamp.get_approval(subject=subject)
+
+
+__all__ = [
+    "SignoffView",
+    "ApprovalView",
+]
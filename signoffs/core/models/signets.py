@@ -9,23 +9,29 @@ To revoke a `Signet`, we can simply delete the `Signet` record.
 To maintain a "blame" history, we can instead record who and when the signet was revoked with a `RevokedSignet`.
 """
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
 from functools import cached_property
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import (
+    FieldDoesNotExist,
     FieldError,
     ImproperlyConfigured,
     PermissionDenied,
     ValidationError,
 )
-from django.db import models
+from django.core.signals import setting_changed
+from django.db import models, transaction
+from django.dispatch import receiver
 from django.utils import timezone
 
 from signoffs import settings
 from signoffs.core.utils import dynamic_import
 
+from .counters import is_counted, update_signoff_counters
+from .readonly import SignoffView
+
 if TYPE_CHECKING:
     from signoffs.core.signoffs import AbstractSignoff
 
@@ -56,21 +62,123 @@ class SignetQuerySet(models.QuerySet):
     def with_revoked_receipt(self):
         """Select related 'revoked' records"""
         try:
-            return self.select_related("revoked")
-        except FieldError:  # no related manager  --> no revoked signets
+            self.model._meta.get_field("revoked")
+        except FieldDoesNotExist:  # no related revoke model --> no revoked signets
+            return self
+        return self.select_related("revoked")
+
+    def with_revoked_flag(self):
+        """
+        Annotate each signet with a `revoked_flag`, True iff it has a revoke receipt, using an Exists subquery
+            - lets `is_revoked()` answer without a query per signet, and without fetching the receipts
+        """
+        try:
+            relation = self.model._meta.get_field("revoked")
+        except FieldDoesNotExist:  # no related revoke model --> no revoked signets
             return self
+        receipts = relation.related_model._base_manager.filter(
+            **{relation.field.name: models.OuterRef("pk")}
+        )
+        return self.annotate(revoked_flag=models.Exists(receipts))
+
+    def _filter_in_memory(self) -> bool:
+        """Return True iff signets are already fetched (e.g., by prefetch_related), or the queryset can't be filtered"""
+        return self._result_cache is not None or self.query.is_sliced
 
     def signoffs(self, signoff_id=None, subject=None):
         """
         Returns list of signoff objects, one for each signet in queryset,
-            optionally filtered for specific signoff type - filtering done in-memory for performance.
+            optionally filtered for specific signoff type.
+        Filtering is done in SQL, unless the signets are already fetched (e.g., prefetched), then it is done in-memory.
         """
+        if signoff_id is not None and not self._filter_in_memory():
+            return self.filter(signoff_id=signoff_id).signoffs(subject=subject)
         return [
             signet.get_signoff(subject=subject)
             for signet in self
             if signoff_id is None or signet.signoff_id == signoff_id
         ]
 
+    def iter_signoffs(self, signoff_id=None, subject=None, chunk_size=2000):
+        """
+        Generate signoff objects, one for each signet in queryset, optionally filtered for specific signoff type.
+        Streams signets from the DB in chunks, with their user and revoke receipt, so memory use is independent of
+            the size of the queryset - for exports and audits over large numbers of signets.
+        """
+        qs = self if signoff_id is None else self.filter(signoff_id=signoff_id)
+        for signet in qs.with_user().with_revoked_receipt().iterator(chunk_size=chunk_size):
+            yield signet.get_signoff(subject=subject)
+
+    def signoff_views(self, signoff_id=None) -> list[SignoffView]:
+        """
+        Returns list of lightweight, read-only SignoffView objects, one for each signet in queryset,
+            optionally filtered for specific signoff type - built from values() rows, without model instances.
+        """
+        qs = self if signoff_id is None else self.filter(signoff_id=signoff_id)
+        try:
+            rows = qs.values(*SignoffView.fields, "revoked")
+        except FieldError:  # caveat: not every signet model has a related revoke model.
+            rows = qs.values(*SignoffView.fields)
+        strings = {}  # share the many repeated signoff ids, sigils, and labels between views
+        views = []
+        for row in rows:
+            for field in ("signoff_id", "sigil", "sigil_label"):
+                row[field] = strings.setdefault(row[field], row[field])
+            views.append(SignoffView.from_row(row))
+        return views
+
+    def _revoked_pks(self, signets) -> set:
+        """Return the set of pk's of the given signets that are revoked - one query, unless signets are flagged"""
+        if all(hasattr(signet, "revoked_flag") for signet in signets):
+            return {signet.pk for signet in signets if signet.is_revoked()}
+        return set(
+            self.model.revoked_signets.filter(pk__in=[signet.pk for signet in signets]).values_list("pk", flat=True)
+        )
+
+    def revoke(self, user, reason="", notify=True):
+        """
+        Revoke every signet in this queryset on behalf of user, in one transaction - return list of revoke receipts
+
+        Set-based equivalent of revoking each signet's signoff with `signoffs.revoke_signoff`:
+            all signets are deleted with one query (so FK relations to them are updated), then signets of Signoff Types
+            with a revokeModel are restored with one bulk_create, and their receipts created with one bulk_create
+            per revokeModel.  Bypasses Signoff Type permissions and any custom revoke_method.
+        notify=False skips calling each signet's signoff_revoked hook, for callers that update related state themselves.
+        Signets that were already revoked are revoked again, but are not counted again by any SignoffCounter.
+        """
+        from signoffs.core.signoffs import notify_signet
+
+        signets = list(self if self._result_cache is not None else self.with_revoked_flag())
+        if not signets:
+            return []
+        revoked = self._revoked_pks(signets) if any(is_counted(signet) for signet in signets) else set()
+        active = [signet for signet in signets if signet.pk not in revoked]
+        revoke_models = [signet.signoff_type.get_revokeModel() for signet in signets]
+        restore = [signet for signet, revoke_model in zip(signets, revoke_models) if revoke_model]
+        manager = self.model._base_manager
+        with transaction.atomic():
+            manager.filter(pk__in=[signet.pk for signet in signets]).delete()
+            for signet in signets:
+                signet.pk = None
+            manager.bulk_create(restore)
+            for signet in restore:
+                if signet.pk is None:  # db can't return primary keys from a bulk insert
+                    signet.save_base(force_insert=True)
+            receipts = {}
+            for signet, revoke_model in zip(signets, revoke_models):
+                if revoke_model:
+                    receipts.setdefault(revoke_model, []).append(
+                        revoke_model(signet=signet, user=user, reason=reason)
+                    )
+            for revoke_model, model_receipts in receipts.items():
+                revoke_model.objects.bulk_create(model_receipts)
+            update_signoff_counters(active, -1)
+            if notify:
+                for signet in signets:
+                    notify_signet(signet.signoff, "signoff_revoked")
+        self._result_cache = None  # like delete(), clear the cache of revoked signets
+        return [receipt for model_receipts in receipts.values() for receipt in model_receipts]
+
 
 BaseSignetManager = models.Manager.from_queryset(SignetQuerySet)
 
@@ -111,6 +219,31 @@ def get_signet_defaults(signet) -> dict[str, str]:
     }
 
 
+def resolve_signet_defaults(defaults) -> Callable[[AbstractSignet], dict]:
+    """
+    Resolve a signet defaults specifier, as for the SIGNOFFS_SIGNET_DEFAULTS setting, to a callable(signet) -> dict
+    None resolves to get_signet_defaults
+    """
+    defaults = dynamic_import(defaults) if isinstance(defaults, str) else defaults
+    if defaults is None:
+        return get_signet_defaults
+    if callable(defaults):
+        return defaults
+    return lambda signet: defaults  # otherwise, defaults must be a dict-like object
+
+
+signet_defaults_providers = {}
+"""Cache of resolved signet defaults providers, by Signet model - see AbstractSignet.get_signet_defaults_provider"""
+
+
+@receiver(setting_changed)
+def reset_signet_defaults_providers(setting, value, **kwargs):
+    """Re-resolve signet defaults providers when the SIGNOFFS_SIGNET_DEFAULTS setting is changed, e.g., in tests"""
+    if setting == "SIGNOFFS_SIGNET_DEFAULTS":
+        settings.SIGNOFFS_SIGNET_DEFAULTS = value
+        signet_defaults_providers.clear()
+
+
 class AbstractSignet(models.Model):
     """
     Abstract base class for all Signet models
@@ -153,6 +286,10 @@ class AbstractSignet(models.Model):
         "timestamp",
     )  # fields managed in code cannot be manipulated
 
+    # dictionary, or callable(signet) that returns one, or a string with dotted import path to either
+    # Overrides the SIGNOFFS_SIGNET_DEFAULTS setting for this Signet model - None to use the setting.
+    signet_defaults = None
+
     def __str__(self):
         return (
             f"{self.signoff_id} by {self.user} at {self.timestamp}"
@@ -203,7 +340,17 @@ class AbstractSignet(models.Model):
         return self.id is not None
 
     def is_revoked(self):
-        """Return True if this Signet has been revoked - Performance: .with_revoked_receipt() to avoid extra query"""
+        """
+        Return True if this Signet has been revoked
+        Performance: .with_revoked_flag() or .with_revoked_receipt() on the queryset to avoid an extra query
+        """
+        try:
+            relation = self._meta.get_field("revoked")
+        except FieldDoesNotExist:  # no related revoke model --> never revoked
+            return False
+        revoked_flag = getattr(self, "revoked_flag", None)
+        if revoked_flag is not None and not relation.is_cached(self):  # a receipt set since fetched takes precedence
+            return revoked_flag
         return hasattr(self, "revoked")
 
     def has_valid_signoff(self):
@@ -223,34 +370,71 @@ class AbstractSignet(models.Model):
                 setattr(self, fld, attrs[fld])
         return self
 
+    @classmethod
+    def get_signet_defaults_provider(cls) -> Callable[[AbstractSignet], dict]:
+        """
+        Return a callable(signet) that returns the dict of default field values for a signet of this model
+        Resolved from cls.signet_defaults, or the SIGNOFFS_SIGNET_DEFAULTS setting, once per model.
+        """
+        provider = signet_defaults_providers.get(cls)
+        if provider is None:
+            defaults = (
+                cls.signet_defaults
+                if cls.signet_defaults is not None
+                else settings.SIGNOFFS_SIGNET_DEFAULTS
+            )
+            provider = signet_defaults_providers[cls] = resolve_signet_defaults(defaults)
+        return provider
+
     def get_signet_defaults(self):
         """Return dict of default field values for this signet - signet MUST have user relation!"""
-        defaults = settings.SIGNOFFS_SIGNET_DEFAULTS
-        defaults = dynamic_import(defaults) if isinstance(defaults, str) else defaults
-        return (
-            get_signet_defaults(self)
-            if defaults is None
-            else defaults(self)
-            if callable(defaults)
-            else defaults  # otherwise, defaults must be a dict-like object
-        )
+        return self.get_signet_defaults_provider()(self)
 
     def set_signet_defaults(self):
         """Set default field values for this signet - signet MUST have user relation!"""
         return self.update(defaults=True, **self.get_signet_defaults())
 
-    def validate_save(self) -> None:
-        """Raise ValidationError if this Signet cannot be saved, otherwise just pass."""
-        self.full_clean()
+    @classmethod
+    def bulk_set_signet_defaults(cls, signets):
+        """Set default field values for each of the signets - signets MUST have user relation!"""
+        provider = cls.get_signet_defaults_provider()
+        for signet in signets:
+            signet.update(defaults=True, **provider(signet))
+        return signets
+
+    def validate_save(self, trusted=None) -> None:
+        """
+        Raise ValidationError if this Signet cannot be saved, otherwise just pass.
+
+        trusted=True skips full_clean(), checking only for a registered signoff_id, unsigned signet, and user.
+        trusted=None uses the SIGNOFFS_TRUSTED_SAVES setting.
+        """
+        trusted = settings.SIGNOFFS_TRUSTED_SAVES if trusted is None else trusted
+        if not trusted:
+            self.full_clean()
         if self.is_signed():
             raise PermissionDenied(f"Unable to re-save previously signed Signet {self}")
         elif not self.can_save():
             raise PermissionDenied(f"Unable to save Signet {self}")
 
-    def save(self, *args, **kwargs):
-        """Add a 'sigil' label if there is not one & check user has permission to save this signet"""
+    def validate_bulk_save(self) -> None:
+        """
+        A cheap validate_save for signets saved in bulk: raise ValidationError if this Signet cannot be saved
+        Field values are validated, but not relations or uniqueness, which would cost a query per signet.
+        """
+        self.clean_fields(exclude=[f.name for f in self._meta.fields if f.is_relation])
+        if self.is_signed():
+            raise PermissionDenied(f"Unable to re-save previously signed Signet {self}")
+        elif not self.can_save():
+            raise PermissionDenied(f"Unable to save Signet {self}")
+
+    def save(self, *args, trusted=None, **kwargs):
+        """
+        Add a 'sigil' label if there is not one & check user has permission to save this signet
+        trusted=True for a fast-path save, without full_clean() - see validate_save
+        """
         self.set_signet_defaults()
-        self.validate_save()
+        self.validate_save(trusted=trusted)
         return super().save(*args, **kwargs)
 
     @classmethod
@@ -265,6 +449,15 @@ class AbstractSignet(models.Model):
         ]
         return bool(relations)
 
+    @classmethod
+    def get_object_relations(cls, model) -> list[models.ForeignKey]:
+        """Return the FK fields relating this Signet class to instances of the given model"""
+        return [
+            f
+            for f in cls._meta.concrete_fields
+            if f.is_relation and f.many_to_one and f.related_model is model
+        ]
+
 
 class AbstractRevokedSignet(models.Model):
     """
@@ -13,11 +13,15 @@ To revoke a Stamp, we alter the approval status and revoke the Signet(s) used to
 A "blame" history, may be maintained by using a RevokeSignet model on the Approval Type.
 """
 from __future__ import annotations
+from collections import defaultdict
 from typing import TYPE_CHECKING
 from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.db import models
 from django.utils import timezone
 
+from signoffs import settings
+
+from .readonly import ApprovalView
 from .signets import AbstractSignet
 
 if TYPE_CHECKING:
@@ -34,6 +38,14 @@ class AbstractApprovalSignet(AbstractSignet):
     class Meta(AbstractSignet.Meta):
         abstract = True
 
+    def signoff_signed(self, signoff):
+        """Hook called by the signoffs API after this signet's signoff is signed - see `notify_signet`"""
+        self.stamp.signoff_signed(signoff)
+
+    def signoff_revoked(self, signoff):
+        """Hook called by the signoffs API after this signet's signoff is revoked - see `notify_signet`"""
+        self.stamp.signoff_revoked(signoff)
+
 
 class ApprovalStampQuerySet(models.QuerySet):
     """
@@ -56,6 +68,37 @@ class ApprovalStampQuerySet(models.QuerySet):
         """Prefetch related signets and their signing users"""
         return self.prefetch_related("signatories__user")
 
+    def rebuild_signing_order_state(self):
+        """Consistency repair: rebuild each stamp's persisted signing order state (if it has one) from its signets"""
+        for approval in self.prefetch_signets().approvals():
+            rebuild = getattr(approval.signing_order, "rebuild", None)
+            if rebuild:
+                rebuild()
+
+    def with_signing_order_state(self):
+        """
+        Returns list of stamps in queryset, each with a `signing_order_status` attribute: a `SigningOrderState` with
+            the stamp's signing order (is_complete, next signoff types), or None if its approval has no signing order.
+        All stamps are evaluated in bulk, with one query for the signets - see `SigningOrder.evaluate_many`
+        """
+        stamps = list(self)
+        histories = signet_histories(stamps)
+        by_signing_order = defaultdict(list)
+        for stamp in stamps:
+            approval_type = stamp.approval_type if stamp.has_valid_approval() else None
+            by_signing_order[getattr(approval_type, "signing_order", None)].append(stamp)
+        for signing_order, group in by_signing_order.items():
+            states = (
+                signing_order.evaluate_histories(
+                    {stamp.pk: histories.get(stamp.pk, ()) for stamp in group}
+                )
+                if signing_order
+                else {}
+            )
+            for stamp in group:
+                stamp.signing_order_status = states.get(stamp.pk)
+        return stamps
+
     def approvals(self, approval_id=None, subject=None):
         """
         Returns list of approval objects, one for each seal in queryset,
@@ -67,10 +110,44 @@ class ApprovalStampQuerySet(models.QuerySet):
             if approval_id is None or seal.approval_id == approval_id
         ]
 
+    def iter_approvals(self, approval_id=None, subject=None, chunk_size=2000):
+        """
+        Generate approval objects, one for each seal in queryset, optionally filtered for specific approval type.
+        Streams stamps from the DB in chunks, so memory use is independent of the size of the queryset.
+        Any prefetch (e.g., prefetch_signatories()) is done per chunk.
+        """
+        qs = self if approval_id is None else self.filter(approval_id=approval_id)
+        for seal in qs.iterator(chunk_size=chunk_size):
+            yield seal.get_approval(subject=subject)
+
+    def approval_views(self, approval_id=None) -> list[ApprovalView]:
+        """
+        Returns list of lightweight, read-only ApprovalView objects, one for each stamp in queryset,
+            optionally filtered for specific approval type - built from values() rows, without model instances.
+        """
+        qs = self if approval_id is None else self.filter(approval_id=approval_id)
+        return [ApprovalView.from_row(row) for row in qs.values(*ApprovalView.fields)]
+
 
 ApprovalStampManager = models.Manager.from_queryset(ApprovalStampQuerySet)
 
 
+def signet_histories(stamps) -> dict[int, tuple[str]]:
+    """
+    Return the chronological sequence of signoff ids signed on each of the given stamps, keyed by stamp id
+    Signets for all stamps are fetched with a single query - stamps must share the same Stamp model.
+    """
+    stamps = [stamp for stamp in stamps if stamp.pk is not None]
+    if not stamps:
+        return {}
+    signet_model = type(stamps[0]).signatories.rel.related_model
+    histories = {stamp.pk: [] for stamp in stamps}
+    signets = signet_model._default_manager.filter(stamp_id__in=histories)
+    for stamp_id, signoff_id in signets.values_list("stamp_id", "signoff_id"):
+        histories[stamp_id].append(signoff_id)  # default ordering is chronological
+    return {stamp_id: tuple(history) for stamp_id, history in histories.items()}
+
+
 def validate_approval_id(value) -> None:
     """Raise ValidationError if value is not a registered Approval Type ID"""
     from signoffs import registry
@@ -151,6 +228,16 @@ class AbstractApprovalStamp(models.Model):
         self.approved = True
         self.timestamp = timezone.now()
 
+    def signoff_signed(self, signoff):
+        """Hook called after a signoff on this stamp is signed - let the approval keep its signing order in sync"""
+        if self.has_valid_approval():
+            self.approval.signoff_signed(signoff)
+
+    def signoff_revoked(self, signoff):
+        """Hook called after a signoff on this stamp is revoked - let the approval keep its signing order in sync"""
+        if self.has_valid_approval():
+            self.approval.signoff_revoked(signoff)
+
     def is_user_signatory(self, user):
         """return True iff the given user is a signatory on this stamp"""
         return any(s.user == user for s in self.signatories.all())
@@ -161,9 +248,18 @@ class AbstractApprovalStamp(models.Model):
 
         return self.approval_id is not None and self.approval_id in registry.approvals
 
-    def save(self, *args, **kwargs):
-        """Validate and save this stamp"""
-        self.full_clean()
+    def save(self, *args, trusted=None, **kwargs):
+        """
+        Validate and save this stamp
+
+        trusted=True skips full_clean(), checking only for a registered approval_id.
+        trusted=None uses the SIGNOFFS_TRUSTED_SAVES setting.
+        """
+        trusted = settings.SIGNOFFS_TRUSTED_SAVES if trusted is None else trusted
+        if trusted:
+            validate_approval_id(self.approval_id)
+        else:
+            self.full_clean()
         return super().save(*args, **kwargs)
 
     @classmethod
@@ -177,3 +273,22 @@ class AbstractApprovalStamp(models.Model):
             and f.name != "user"
         ]
         return bool(relations)
+
+
+class SigningOrderStateMixin(models.Model):
+    """
+    Opt-in field for a Stamp model to persist its compact signing order state
+    Required on the stampModel of any Approval Type with a `SigningOrder(..., persist_state=True)`.
+    Adding this mixin to an existing Stamp model adds a field, so it needs a schema migration (makemigrations).
+
+    For example::
+
+        class Stamp(AbstractApprovalStamp, SigningOrderStateMixin):
+            pass
+    """
+
+    # compact signing order automaton state, maintained by PersistedSigningOrderPatternMatcher
+    signing_order_state = models.TextField(null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
@@ -0,0 +1,105 @@
+"""
+Request-scoped cache of user permission checks made by signoff and approval business logic.
+
+Rendering a page of approvals checks the same few permissions for the same user over and over - once per signoff
+    instance and per candidate Signoff Type.  With custom auth backends (object permissions, LDAP groups, etc.)
+    each of those checks can be costly.
+While a `PermissionCache` is active, `has_perm` memoizes results keyed by (user id, perm).
+`PermissionCacheMiddleware` activates a fresh cache for each request, so permission changes are seen by the next one.
+Outside an active cache (e.g., management commands, tests), every check goes straight to `user.has_perm`.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable
+
+_active_cache: ContextVar[PermissionCache | None] = ContextVar(
+    "signoffs_permission_cache", default=None
+)
+
+
+class PermissionCache:
+    """A memo of user.has_perm results, keyed by (user id, perm)"""
+
+    def __init__(self):
+        self._perms = {}
+
+    def __len__(self):
+        return len(self._perms)
+
+    @staticmethod
+    def is_cacheable(user) -> bool:
+        """Only results for saved users can be told apart by user id"""
+        return getattr(user, "pk", None) is not None
+
+    def has_perm(self, user, perm: str) -> bool:
+        """Return user.has_perm(perm), from the cache if possible"""
+        if not self.is_cacheable(user):
+            return user.has_perm(perm)
+        key = (user.pk, perm)
+        if key not in self._perms:
+            self._perms[key] = user.has_perm(perm)
+        return self._perms[key]
+
+    def has_perms(self, user, perms: Iterable[str]) -> dict[str, bool]:
+        """
+        Return dict of {perm: user.has_perm(perm)} for each of the given perms, filling the cache in one batch:
+            every granted perm is found with one call to `user.get_all_permissions()`, only the rest are checked one by one.
+        Users without `get_all_permissions()` (e.g., custom user models without PermissionsMixin) are checked one by one.
+        """
+        perms = list(dict.fromkeys(perms))
+        if self.is_cacheable(user) and hasattr(user, "get_all_permissions"):
+            missing = [perm for perm in perms if (user.pk, perm) not in self._perms]
+            if len(missing) > 1:
+                granted = user.get_all_permissions()
+                for perm in missing:
+                    if perm in granted:
+                        self._perms[(user.pk, perm)] = True
+        return {perm: self.has_perm(user, perm) for perm in perms}
+
+    def clear(self) -> None:
+        """Forget all cached results, e.g., after a user's permissions are changed"""
+        self._perms.clear()
+
+
+def get_permission_cache() -> PermissionCache | None:
+    """Return the active PermissionCache, or None if no cache is active"""
+    return _active_cache.get()
+
+
+@contextmanager
+def permission_cache(cache: PermissionCache = None):
+    """Activate the given (or a new) PermissionCache for the duration of the context - yields the cache"""
+    cache = cache if cache is not None else PermissionCache()
+    token = _active_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _active_cache.reset(token)
+
+
+def has_perm(user, perm: str) -> bool:
+    """Return user.has_perm(perm), from the active PermissionCache, if there is one"""
+    cache = get_permission_cache()
+    return cache.has_perm(user, perm) if cache is not None else user.has_perm(perm)
+
+
+class PermissionCacheMiddleware:
+    """Activate a new PermissionCache for each request - add "signoffs.permissions.PermissionCacheMiddleware" """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with permission_cache():
+            return self.get_response(request)
+
+
+__all__ = [
+    "PermissionCache",
+    "PermissionCacheMiddleware",
+    "get_permission_cache",
+    "has_perm",
+    "permission_cache",
+]
@@ -1,7 +1,13 @@
 from .signing_order import (
+    CompileReport,
+    PersistedSigningOrderPatternMatcher,
+    SignatoryGenerations,
     SigningOrder,
     SigningOrderPatternMatcher,
+    SigningOrderState,
     SigningOrderStrategyProtocol,
+    compile_signing_orders,
+    warm_up_signing_orders,
 )
 from .signoff_pattern import (
     AnyOneOf,
@@ -10,6 +16,7 @@ from .signoff_pattern import (
     ExactlyOne,
     InParallel,
     InSeries,
+    Interleaved,
     OneOrMore,
     Optional,
     ZeroOrMore,
@@ -0,0 +1,196 @@
+"""
+Static analysis of Signing Order patterns - properties of a pattern that hold for every sequence of signoffs
+
+Analysis is done over the pattern's automaton_match expression tree, which represents every pattern construct,
+    without compiling a matcher, so it is cheap enough to run on any pattern, regardless of its backend.
+Reports:
+    - min_length / max_length: the min. and max. number of signoffs in a sequence that completes the pattern
+    - dead_terms: terms that can never be part of a sequence that completes the pattern
+    - ambiguities: places where one signoff could be matched by more than one term (e.g., overlapping InParallel terms)
+      These are exactly the cases where the regex backend's greedy, first-alternative-wins matching may be surprising.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import permutations
+from typing import TYPE_CHECKING
+
+from .automaton_match import first, nullable
+
+if TYPE_CHECKING:
+    from .signoff_pattern import SigningOrderPattern
+
+UNMATCHABLE = None  # min_length of an expression that can't match any sequence
+
+
+@dataclass
+class PatternAnalysis:
+    """The static properties of a Signing Order pattern - see `analyze`"""
+
+    min_length: int | None  # None if the pattern can never be completed
+    max_length: int | None  # None if unbounded
+    dead_terms: list = field(default_factory=list)  # pattern terms that can never be matched
+    ambiguities: list = field(default_factory=list)  # descriptions of ambiguous parts of the pattern
+
+    @property
+    def is_ambiguous(self) -> bool:
+        return bool(self.ambiguities)
+
+    def exceeds_max_length(self, n: int) -> bool:
+        """Return True iff a sequence of n signoffs is too long to ever be a valid match for the pattern"""
+        return self.max_length is not None and n > self.max_length
+
+
+#
+# Expression properties
+#
+
+
+def _add(a, b):
+    """Add lengths, where None is infinite for max lengths"""
+    return None if a is None or b is None else a + b
+
+
+def length_bounds(expr) -> tuple:
+    """Return (min, max) number of tokens matched by expr - min is UNMATCHABLE, max is None (unbounded) as needed"""
+    kind = expr[0]
+    if kind == "tok":
+        return 1, 1
+    if kind == "eps":
+        return 0, 0
+    if kind == "empty":
+        return UNMATCHABLE, 0
+    if kind == "rep":
+        _, e, lo, hi = expr
+        lo_e, hi_e = length_bounds(e)
+        if lo_e is UNMATCHABLE:
+            return (0, 0) if lo == 0 else (UNMATCHABLE, 0)
+        if hi_e == 0:
+            return 0, 0
+        return lo * lo_e, None if hi is None or hi_e is None else hi * hi_e
+    terms = (
+        list(expr[1])
+        if kind in ("seq", "alt")
+        else [e for e, n in expr[1] for _ in range(n)]
+    )
+    bounds = [length_bounds(e) for e in terms]
+    if kind == "alt":
+        matchable = [b for b in bounds if b[0] is not UNMATCHABLE]
+        if not matchable:
+            return UNMATCHABLE, 0
+        maxes = [b[1] for b in matchable]
+        return min(b[0] for b in matchable), None if None in maxes else max(maxes)
+    # seq, all, shuf: every term is matched
+    if any(b[0] is UNMATCHABLE for b in bounds):
+        return UNMATCHABLE, 0
+    lo = hi = 0
+    for b in bounds:
+        lo, hi = lo + b[0], _add(hi, b[1])
+    return lo, hi
+
+
+def used_tokens(expr) -> set:
+    """Return the set of tokens that appear in some sequence matched by expr"""
+    kind = expr[0]
+    if kind == "tok":
+        return {expr[1]}
+    if kind == "rep":
+        return used_tokens(expr[1]) if length_bounds(expr)[1] != 0 else set()
+    if kind in ("eps", "empty") or length_bounds(expr)[0] is UNMATCHABLE:
+        return set()
+    terms = list(expr[1]) if kind in ("seq", "alt") else [e for e, _ in expr[1]]
+    return set().union(*(used_tokens(e) for e in terms))
+
+
+def continuations(expr) -> set:
+    """Return the set of tokens that could extend a complete match of expr into a longer match of expr"""
+    kind = expr[0]
+    if kind == "rep":
+        _, e, lo, hi = expr
+        repeats = hi is None or hi > 1
+        return continuations(e) | (first(e) if repeats else set())
+    if kind == "alt":
+        return set().union(*(continuations(e) for e in expr[1]))
+    if kind == "seq":
+        tokens = set()
+        for e in expr[1]:
+            tokens = (tokens | first(e) if nullable(e) else set()) | continuations(e)
+        return tokens
+    if kind in ("all", "shuf"):
+        terms = [e for e, _ in expr[1]]
+        return set().union(
+            *(continuations(e) | (first(e) if nullable(e) else set()) for e in terms)
+        )
+    return set()
+
+
+def find_ambiguities(expr) -> list:
+    """Return a list of (kind, tokens) for each ambiguous construct in expr"""
+    kind = expr[0]
+    found = []
+    if kind == "rep":
+        _, e, lo, hi = expr
+        overlap = continuations(e) & first(e) if hi is None or hi > 1 else set()
+        if overlap:
+            found.append(("repeat", overlap))
+        return found + find_ambiguities(e)
+    if kind not in ("seq", "alt", "all", "shuf"):
+        return found
+    terms = list(expr[1]) if kind in ("seq", "alt") else [e for e, _ in expr[1]]
+    if kind == "seq":
+        # a token that could either continue (or start an optional) term, or start one of the terms that follow it.
+        for i, e in enumerate(terms):
+            following = set()
+            for f in terms[i + 1 :]:
+                following |= first(f)
+                if not nullable(f):
+                    break
+            overlap = (continuations(e) | (first(e) if nullable(e) else set())) & following
+            if overlap:
+                found.append(("series", overlap))
+    elif kind == "alt":
+        overlap = set()
+        for a, b in permutations(terms, 2):
+            overlap |= first(a) & first(b)
+        if overlap:
+            found.append(("alternatives", overlap))
+    elif kind == "all":
+        overlap = set()
+        for a, b in permutations(terms, 2):
+            overlap |= (first(a) | continuations(a)) & first(b)
+        if overlap or len(terms) < sum(n for _, n in expr[1]):
+            found.append(("parallel", overlap or used_tokens(expr)))
+    elif kind == "shuf":
+        overlap = set()
+        for a, b in permutations(terms, 2):
+            overlap |= used_tokens(a) & used_tokens(b)
+        if overlap or len(terms) < sum(n for _, n in expr[1]):
+            found.append(("interleaved", overlap or used_tokens(expr)))
+    for e in terms:
+        found += find_ambiguities(e)
+    return found
+
+
+def analyze(pattern: SigningOrderPattern) -> PatternAnalysis:
+    """Return the PatternAnalysis for the given Signing Order pattern"""
+    automaton = pattern.automaton_pattern()
+    expr = automaton.expr
+    lo, hi = length_bounds(expr)
+    used = used_tokens(expr)
+    from_str = pattern.token_repr.pattern_from_str
+    dead = [from_str(t) for t in dict.fromkeys(automaton.tokens) if t not in used]
+    ambiguities = [
+        f"{kind}: {', '.join(sorted(tokens))}" for kind, tokens in find_ambiguities(expr)
+    ]
+    return PatternAnalysis(
+        min_length=lo if lo is UNMATCHABLE else max(lo, 1),  # no pattern is complete with no tokens
+        max_length=hi,
+        dead_terms=dead,
+        ambiguities=ambiguities,
+    )
+
+
+__all__ = [
+    "PatternAnalysis",
+    "analyze",
+]
@@ -0,0 +1,410 @@
+"""
+Automaton-based Pattern Matching language for a sequence of tokens - an alternative backend to regex_match
+
+A pattern is compiled to an expression tree, and matched by a DFA whose states are the Brzozowski derivatives of
+that expression.  States are built lazily, only when a token sequence actually reaches them, and transitions are
+cached, so matching a sequence costs one table lookup per token once its path through the DFA has been built.
+
+Parallel groups (all_of) are represented by the multiset of their remaining terms rather than an alternation of
+every permutation of their terms, so a group of n terms has at most 2^n states, instead of n! regex branches.
+Repeated terms are represented by counters (min / max remaining repetitions).
+Interleaved groups (interleave_of) have true parallel semantics: each term matches its own, not necessarily consecutive,
+subsequence of tokens.  A state is the multiset of partially matched terms, so each term carries its own counters.
+
+Design Constraints:
+    Drop-in replacement for regex_match.PatternMatcher - same pattern constructors and same MatchResult semantics.
+"""
+import hashlib
+import json
+from collections import Counter
+from dataclasses import dataclass
+from functools import cached_property
+
+from .regex_match import MatchResult
+
+# Expressions are plain, hashable tuples: (kind, *operands) - they are used as keys for DFA states.
+EMPTY = ("empty",)  # matches nothing at all
+EPSILON = ("eps",)  # matches only the empty sequence
+
+
+@dataclass
+class Pattern:
+    """
+    A pattern consists of the expression for matching the pattern
+        and the list of tokens matched in the expression
+    """
+
+    expr: tuple
+    tokens: list
+
+
+#
+# EXPRESSION CONSTRUCTORS - normalize expressions so equivalent states share a single representation
+#
+
+
+def _multiset(items):
+    """Return a hashable multiset of the given expressions"""
+    return frozenset(Counter(items).items())
+
+
+def _remove_one(multiset, expr):
+    """Return the list of expressions in multiset with one occurrence of expr removed"""
+    items = Counter(dict(multiset))
+    items[expr] -= 1
+    return list(items.elements())
+
+
+def _seq(*exprs):
+    """A sequence of expressions, flattened, with empty sub-sequences removed"""
+    flat = []
+    for e in exprs:
+        if e == EMPTY:
+            return EMPTY
+        if e[0] == "seq":
+            flat.extend(e[1])
+        elif e != EPSILON:
+            flat.append(e)
+    if not flat:
+        return EPSILON
+    return flat[0] if len(flat) == 1 else ("seq", tuple(flat))
+
+
+def _alt(*exprs):
+    """Alternation of expressions, flattened, with duplicates and failed alternatives removed"""
+    alternatives = set()
+    for e in exprs:
+        if e[0] == "alt":
+            alternatives.update(e[1])
+        elif e != EMPTY:
+            alternatives.add(e)
+    if not alternatives:
+        return EMPTY
+    return alternatives.pop() if len(alternatives) == 1 else ("alt", frozenset(alternatives))
+
+
+def _repeat(expr, lo, hi=None):
+    """Between lo and hi (None for unbounded) consecutive repetitions of expr"""
+    if hi == 0 or expr == EPSILON:
+        return EPSILON
+    if expr == EMPTY:
+        return EPSILON if lo == 0 else EMPTY
+    if lo == 1 and hi == 1:
+        return expr
+    return ("rep", expr, lo, hi)
+
+
+def _all_of(*exprs):
+    """All of the expressions, each as a consecutive block, in any order"""
+    exprs = [e for e in exprs if e != EPSILON]
+    if EMPTY in exprs:
+        return EMPTY
+    if not exprs:
+        return EPSILON
+    return exprs[0] if len(exprs) == 1 else ("all", _multiset(exprs))
+
+
+def _shuffle(*exprs):
+    """All of the expressions, with their tokens interleaved in any order"""
+    exprs = [e for e in exprs if e != EPSILON]
+    if EMPTY in exprs:
+        return EMPTY
+    if not exprs:
+        return EPSILON
+    return exprs[0] if len(exprs) == 1 else ("shuf", _multiset(exprs))
+
+
+#
+# EXPRESSION SEMANTICS
+#
+
+
+def nullable(expr):
+    """Return True iff the expression matches the empty sequence"""
+    kind = expr[0]
+    if kind == "tok":
+        return False
+    if kind == "seq":
+        return all(nullable(e) for e in expr[1])
+    if kind == "alt":
+        return any(nullable(e) for e in expr[1])
+    if kind == "rep":
+        return expr[2] == 0 or nullable(expr[1])
+    if kind in ("all", "shuf"):
+        return all(nullable(e) for e, _ in expr[1])
+    return kind == "eps"
+
+
+def first(expr):
+    """Return the set of tokens that could appear first in a sequence matching expr"""
+    kind = expr[0]
+    if kind == "tok":
+        return {expr[1]}
+    if kind == "seq":
+        tokens = set()
+        for e in expr[1]:
+            tokens |= first(e)
+            if not nullable(e):
+                break
+        return tokens
+    if kind == "alt":
+        return set().union(*(first(e) for e in expr[1]))
+    if kind == "rep":
+        return first(expr[1])
+    if kind in ("all", "shuf"):
+        return set().union(*(first(e) for e, _ in expr[1]))
+    return set()
+
+
+def derive(expr, token):
+    """Return the derivative of expr w.r.t. token: the expression matching whatever may follow token in expr"""
+    kind = expr[0]
+    if kind == "tok":
+        return EPSILON if expr[1] == token else EMPTY
+    if kind == "seq":
+        head, rest = expr[1][0], _seq(*expr[1][1:])
+        derivative = _seq(derive(head, token), rest)
+        return _alt(derivative, derive(rest, token)) if nullable(head) else derivative
+    if kind == "alt":
+        return _alt(*(derive(e, token) for e in expr[1]))
+    if kind == "rep":
+        _, e, lo, hi = expr
+        return _seq(
+            derive(e, token),
+            _repeat(e, max(lo - 1, 0), None if hi is None else hi - 1),
+        )
+    if kind == "all":
+        return _alt(
+            *(
+                _seq(derive(e, token), _all_of(*_remove_one(expr[1], e)))
+                for e, _ in expr[1]
+            )
+        )
+    if kind == "shuf":
+        # the token may advance any one of the terms, which then stays in the group with the others.
+        return _alt(
+            *(
+                _shuffle(derive(e, token), *_remove_one(expr[1], e))
+                for e, _ in expr[1]
+            )
+        )
+    return EMPTY
+
+
+#
+# PATTERN CONSTRUCTORS - same API as regex_match
+#
+
+
+def group_name(s):
+    """Return the name used to report matches of token s, equivalent to the regex_match named group for s"""
+    for e in ["-", ".", "|", "(", ")", "{", "}", "+", "*", "?"]:
+        s = s.replace(e, "")
+    return s
+
+
+def wrap(s):
+    """
+    Create a Pattern out of a single string token
+        if s is a Pattern that already has an expression and token(s) associated with it, simply pass it through
+    """
+    if isinstance(s, str):
+        return Pattern(("tok", s), [s])
+    else:
+        return s
+
+
+def exactly_one(s):
+    """Given a string token or pattern s, create a pattern that matches exactly one occurrence of s"""
+    return wrap(s)
+
+
+def zero_or_one(s):
+    """Optionally match zero or one of token, s"""
+    ws = wrap(s)
+    return Pattern(_repeat(ws.expr, 0, 1), ws.tokens)
+
+
+def zero_or_more(s):
+    """Given a string token or pattern s, create a pattern that matches zero or more occurrences of s"""
+    ws = wrap(s)
+    return Pattern(_repeat(ws.expr, 0), ws.tokens)
+
+
+def exactly_n(s, n):
+    """Given a string token or pattern s, create a pattern that matches exactly n occurrences of s"""
+    ws = wrap(s)
+    return Pattern(_repeat(ws.expr, n, n), ws.tokens)
+
+
+def one_or_more(s):
+    """Given a string token or pattern s, create a pattern that matches one or more occurrences of s"""
+    ws = wrap(s)
+    return Pattern(_repeat(ws.expr, 1), ws.tokens)
+
+
+def n_or_more(s, n):
+    """Given a string token or pattern s, create a pattern that matches n or more occurrences of s"""
+    ws = wrap(s)
+    return Pattern(_repeat(ws.expr, n), ws.tokens)
+
+
+def _combine(constructor, lst):
+    """Combine the given list of string tokens or patterns into a single pattern using an expression constructor"""
+    patterns = [wrap(e) for e in lst]
+    tokens = [t for p in patterns for t in p.tokens]
+    return Pattern(constructor(*(p.expr for p in patterns)), tokens)
+
+
+def in_series(*lst):
+    """Given a list lst with string tokens or patterns, create a pattern that matches the given list in order"""
+    return _combine(_seq, lst)
+
+
+def all_of(*lst):
+    """
+    Given a list with string tokens or patterns, create a pattern that matches if and only if
+    all of the elements of lst occur, in no particular order.
+    Equivalent to regex_match.all_of - each element matches a consecutive run of tokens.
+    """
+    return _combine(_all_of, lst)
+
+
+def interleave_of(*lst):
+    """
+    Given a list with string tokens or patterns, create a pattern that matches if and only if
+    all of the elements of lst occur, with their tokens interleaved in any order.
+    Unlike all_of, each element may match tokens that are not consecutive.
+    """
+    return _combine(_shuffle, lst)
+
+
+def one_of(*lst):
+    """Given a list with string tokens or patterns, create a pattern that matches any one of the patterns/tokens"""
+    return _combine(_alt, lst)
+
+
+class PatternMatcher:
+    """
+    A special-purpose pattern matcher for a sequence of tokens, backed by a lazily-built DFA.
+    Must be initialised with a Pattern template (see Pattern class above) to be matched against
+        - the Pattern template would usually be produced by utilizing a combination
+          of the pattern generator functions defined above
+    """
+
+    DEAD = 0  # the state id of the dead state: EMPTY, no sequence can ever match from here.
+
+    def __init__(self, pattern):
+        # extract and store unique tokens in the order they appear in the pattern
+        self.tokens = list(dict.fromkeys(pattern.tokens))
+        # DFA tables, indexed by state id
+        self.states = []  # the expression for each state
+        self.transitions = []  # dict: token -> state id
+        self.accepting = []  # True iff state is a final state
+        self.next_tokens = []  # tokens with a transition to a live state, in pattern order
+        self._state_ids = {}  # expression -> state id
+        self.add_state(EMPTY)
+        self.start = self.add_state(pattern.expr)
+
+    def add_state(self, expr):
+        """Return the id for the DFA state represented by expr, adding it to the DFA tables if it is a new state"""
+        state = self._state_ids.get(expr)
+        if state is None:
+            allowed = first(expr)
+            state = len(self.states)
+            self.states.append(expr)
+            self.transitions.append({})
+            self.accepting.append(nullable(expr))
+            self.next_tokens.append([t for t in self.tokens if t in allowed])
+            self._state_ids[expr] = state
+        return state
+
+    def step(self, state, token):
+        """Return the state id reached from given state by consuming one token"""
+        transitions = self.transitions[state]
+        next_state = transitions.get(token)
+        if next_state is None:
+            next_state = self.add_state(derive(self.states[state], token))
+            transitions[token] = next_state
+        return next_state
+
+    def run(self, tokens, state=None):
+        """Consume the sequence of tokens from given state (default: start) and return the final state id"""
+        state = self.start if state is None else state
+        for token in tokens:
+            state = self.step(state, token)
+            if state == self.DEAD:
+                break
+        return state
+
+    # State serialization - a compact, process-independent representation of a DFA state, e.g., for persistence.
+    #   tokens are encoded by their index in self.tokens; the fingerprint identifies the pattern and its tokens.
+
+    def _encode(self, expr):
+        kind = expr[0]
+        if kind == "tok":
+            return ["t", self.tokens.index(expr[1])]
+        if kind == "seq":
+            return ["s", [self._encode(e) for e in expr[1]]]
+        if kind == "alt":
+            return ["a", sorted((self._encode(e) for e in expr[1]), key=json.dumps)]
+        if kind == "rep":
+            return ["r", self._encode(expr[1]), expr[2], expr[3]]
+        if kind in ("all", "shuf"):
+            code = "p" if kind == "all" else "i"
+            return [code, sorted(([self._encode(e), n] for e, n in expr[1]), key=json.dumps)]
+        return [kind]
+
+    def _decode(self, data):
+        kind = data[0]
+        if kind == "t":
+            return ("tok", self.tokens[data[1]])
+        if kind == "s":
+            return ("seq", tuple(self._decode(e) for e in data[1]))
+        if kind == "a":
+            return ("alt", frozenset(self._decode(e) for e in data[1]))
+        if kind == "r":
+            return ("rep", self._decode(data[1]), data[2], data[3])
+        if kind in ("p", "i"):
+            kind = "all" if kind == "p" else "shuf"
+            return (kind, frozenset((self._decode(e), n) for e, n in data[1]))
+        return (kind,)
+
+    @cached_property
+    def fingerprint(self):
+        """A short hash that identifies this matcher's pattern - serialized states are only valid for same pattern"""
+        key = json.dumps([self.tokens, self._encode(self.states[self.start])])
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def dumps_state(self, state):
+        """Return a compact JSON-serializable representation of the given state id"""
+        return self._encode(self.states[state])
+
+    def loads_state(self, data):
+        """Return the state id for a state representation produced by dumps_state"""
+        return self.add_state(self._decode(data))
+
+    def captures(self, tokens):
+        """Return a dict of matched tokens, keyed by group name, in the same form as a regex capturesdict"""
+        matched = {group_name(t): [] for t in self.tokens}
+        for t in tokens:
+            matched[group_name(t)].append(t)
+        return matched
+
+    def match(self, token_str, find_next=True):
+        """
+        Match the string of concrete tokens against this matcher's pattern, return a MatchResult
+
+        Single pass: the token sequence is scanned once and the next tokens are read off the final DFA state.
+        find_next=False leaves result.next empty, for API compatibility with regex_match.PatternMatcher.
+        """
+        tokens = token_str.split()
+        state = self.run(tokens)
+        if state == self.DEAD:
+            return MatchResult()
+        return MatchResult(
+            is_valid=True,
+            is_complete=bool(tokens) and self.accepting[state],
+            matched=self.captures(tokens) if tokens else {},
+            next=list(self.next_tokens[state]) if find_next else [],
+        )
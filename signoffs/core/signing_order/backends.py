@@ -0,0 +1,103 @@
+"""
+Pluggable pattern matching backends for Signing Order patterns
+
+A backend compiles a `SigningOrderPattern` into some engine-specific matcher, then matches sequences of token strings
+    against the compiled matcher, returning a `regex_match.MatchResult`.
+Patterns are compiled over their compact `token_alphabet`, so the token strings a backend matches are interned codes.
+The backend is chosen per pattern, with the `backend` argument, or globally with the SIGNOFFS_SIGNING_ORDER_BACKEND
+    setting.  Backends are registered by name - "regex" (the default, reference implementation) and "automaton".
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Protocol, Sequence
+
+from django.core.exceptions import ImproperlyConfigured
+
+from signoffs.settings import SIGNOFFS_SIGNING_ORDER_BACKEND
+
+from . import automaton_match, regex_match
+
+if TYPE_CHECKING:
+    from .signoff_pattern import SigningOrderPattern
+
+
+class MatcherBackend(Protocol):
+    """The protocol for a pattern matching backend"""
+
+    def compile(self, pattern: SigningOrderPattern):
+        """Return a compiled matcher for the given pattern, over its token_alphabet - the result is cached on the pattern"""
+        ...
+
+    def match(self, compiled, tokens: Sequence[str], find_next=True) -> regex_match.MatchResult:
+        """Match the sequence of token strings against the compiled matcher, return a MatchResult"""
+        ...
+
+    def size(self, compiled) -> int:
+        """Return a measure of the compiled matcher's size, for diagnostics"""
+        ...
+
+
+class RegexBackend:
+    """Match patterns with the regex_match.PatternMatcher - the reference implementation"""
+
+    def compile(self, pattern: SigningOrderPattern):
+        return regex_match.PatternMatcher(pattern.regex_pattern(pattern.token_alphabet))
+
+    def match(self, compiled, tokens: Sequence[str], find_next=True) -> regex_match.MatchResult:
+        return compiled.match(" ".join(tokens), find_next=find_next)
+
+    def size(self, compiled) -> int:
+        """The length of the compiled regex"""
+        return len(compiled.template.pattern)
+
+
+class AutomatonBackend:
+    """Match patterns with the lazy DFA automaton_match.PatternMatcher"""
+
+    def compile(self, pattern: SigningOrderPattern):
+        return automaton_match.PatternMatcher(pattern.automaton_pattern(pattern.token_alphabet))
+
+    def match(self, compiled, tokens: Sequence[str], find_next=True) -> regex_match.MatchResult:
+        return compiled.match(" ".join(tokens), find_next=find_next)
+
+    def size(self, compiled) -> int:
+        """The number of DFA states built so far - states are built lazily, as token sequences reach them"""
+        return len(compiled.states)
+
+
+backends: dict[str, MatcherBackend] = {}
+"""Singleton - the registry of matcher backends, by name"""
+
+
+def register_backend(name: str, backend: MatcherBackend) -> MatcherBackend:
+    """Register the backend under the given name, replacing any backend already registered with that name"""
+    backends[name] = backend
+    return backend
+
+
+def get_backend(name: str = None) -> MatcherBackend:
+    """
+    Return the backend registered with given name, or the SIGNOFFS_SIGNING_ORDER_BACKEND if name is None.
+    Raise ImproperlyConfigured if no such backend was registered.
+    """
+    name = name or SIGNOFFS_SIGNING_ORDER_BACKEND
+    try:
+        return backends[name]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Signing order backend {name} must be registered before it can be used."
+        ) from None
+
+
+register_backend("regex", RegexBackend())
+register_backend("automaton", AutomatonBackend())
+
+
+__all__ = [
+    "MatcherBackend",
+    "RegexBackend",
+    "AutomatonBackend",
+    "backends",
+    "register_backend",
+    "get_backend",
+]
@@ -0,0 +1,116 @@
+"""
+On-disk cache of compiled Signing Order patterns - short-lived worker processes load compiled matchers from disk
+    rather than each re-compiling every signing order.
+
+Enabled by the SIGNOFFS_SIGNING_ORDER_CACHE_DIR setting.  Each compiled matcher is pickled to its own file, named for
+    a hash of the pattern tree (pattern types, arguments, and token strings, i.e., signoff ids), the backend,
+    and the library and python versions - so changing a pattern or a signoff id, or upgrading, simply misses the cache.
+Cache files are loaded with pickle - the cache directory must only be writable by trusted processes.
+Any error reading or writing the cache is logged and otherwise ignored - the pattern is compiled as usual.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from typing import TYPE_CHECKING
+
+import signoffs
+from signoffs.settings import SIGNOFFS_SIGNING_ORDER_CACHE_DIR
+
+from . import backends
+
+if TYPE_CHECKING:
+    from .signoff_pattern import SigningOrderPattern
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(pattern: SigningOrderPattern) -> str:
+    """Return a hash that identifies the compiled matcher for the given pattern"""
+    backend_name = pattern.backend or backends.SIGNOFFS_SIGNING_ORDER_BACKEND
+    key = json.dumps(
+        [
+            pattern.pattern_tree(),
+            backend_name,
+            type(pattern.matcher_backend).__qualname__,
+            signoffs.__version__,
+            sys.version_info[:2],
+        ],
+        default=str,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def cache_path(pattern: SigningOrderPattern, cache_dir=None) -> str | None:
+    """Return the path to the cache file for given pattern, or None if the cache is disabled"""
+    cache_dir = cache_dir or SIGNOFFS_SIGNING_ORDER_CACHE_DIR
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, f"{cache_key(pattern)}.pickle")
+
+
+def is_cached(pattern: SigningOrderPattern, cache_dir=None) -> bool:
+    """Return True iff there is a cache file for the given pattern"""
+    path = cache_path(pattern, cache_dir)
+    return path is not None and os.path.exists(path)
+
+
+def load(pattern: SigningOrderPattern, cache_dir=None):
+    """Return the compiled matcher for given pattern from the cache, or None if it is not cached"""
+    path = cache_path(pattern, cache_dir)
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # a corrupt or incompatible cache file is just a cache miss
+        logger.warning("Ignoring unreadable signing order cache file %s: %s", path, e)
+        return None
+
+
+def save(pattern: SigningOrderPattern, compiled, cache_dir=None):
+    """
+    Write the compiled matcher for given pattern to the cache, if it is enabled
+    Written atomically, so concurrent workers only ever see complete cache files.
+    """
+    path = cache_path(pattern, cache_dir)
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except Exception as e:
+        logger.warning("Unable to write signing order cache file %s: %s", path, e)
+
+
+def load_or_compile(pattern: SigningOrderPattern):
+    """Return the compiled matcher for given pattern, loaded from the cache, or compiled and saved to the cache"""
+    compiled = load(pattern)
+    if compiled is None:
+        compiled = pattern.matcher_backend.compile(pattern)
+        save(pattern, compiled)
+    return compiled
+
+
+__all__ = [
+    "cache_key",
+    "cache_path",
+    "is_cached",
+    "load",
+    "save",
+    "load_or_compile",
+]
@@ -147,8 +147,13 @@ class PatternMatcher:
         # extract and store unique tokens in the order they appear in the pattern
         self.tokens = list(dict.fromkeys(pattern.tokens))
 
-    def match(self, token_str):
-        """Match the string of concrete tokens against this matcher's pattern, return a MatchResult"""
+    def match(self, token_str, find_next=True):
+        """
+        Match the string of concrete tokens against this matcher's pattern, return a MatchResult
+
+        Finding the next tokens costs one extra scan of token_str per unique token in the pattern
+            - use find_next=False when only validity or completeness is needed (result.next will be empty).
+        """
         # add a space at the end if there isn't one - makes life easier if we can rely on that space always being there
         token_str = token_str + (
             "" if token_str.endswith(" ") or not token_str else " "
@@ -157,7 +162,7 @@ class PatternMatcher:
         regex_match = self.template.fullmatch(token_str, partial=True)
         if regex_match or not at_least_one_token:
             next = []
-            for t in self.tokens:  # find tokens that may appear next in pattern
+            for t in self.tokens if find_next else ():  # find tokens that may appear next in pattern
                 if self.template.fullmatch(token_str + t + " ", partial=True):
                     next.append(t)
             return MatchResult(
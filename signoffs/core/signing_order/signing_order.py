@@ -1,14 +1,27 @@
 """
     Signoff sequence ordering automation, based on pattern matching Signoff instances to expected Types.
 """
-from typing import Protocol
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from functools import cached_property
+from itertools import count
+from typing import NamedTuple, Protocol
 
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import transaction
 
+from signoffs import registry
 from signoffs.core.signoffs import AbstractSignoff
+from signoffs.core.signing_order import compiled_cache
 from signoffs.core.signing_order import signoff_pattern as pm
 
 
+logger = logging.getLogger(__name__)
+
+
 def validate_signing_order_pattern(pattern: pm.SigningOrderPattern):
     """Raise Improperly configured if the given signing order pattern is not valid."""
     terms = list(pattern.terms())
@@ -23,9 +36,23 @@ def validate_signing_order_pattern(pattern: pm.SigningOrderPattern):
         raise ImproperlyConfigured(
             "SigningOrder: all pattern Signoff Types must share the same Signet model."
         )
+    backend = pattern.backend or pm.backends.SIGNOFFS_SIGNING_ORDER_BACKEND
+    for p in pattern.subpatterns():
+        if p.required_backend not in (None, backend):
+            raise ImproperlyConfigured(
+                f"SigningOrder: {type(p).__name__} patterns require the {p.required_backend!r} backend, "
+                f"not {backend!r} - e.g., SigningOrder(..., backend={p.required_backend!r})"
+            )
     return True
 
 
+class SigningOrderState(NamedTuple):
+    """The state of a signing order for one stamp, as produced by bulk evaluation - see `SigningOrder.evaluate_many`"""
+
+    is_complete: bool
+    next: list
+
+
 class SigningOrderStrategyProtocol(Protocol):
     """Protocol for defining the API required to define a strategy for ordering a sequence of signoffs"""
 
@@ -38,6 +65,43 @@ class SigningOrderStrategyProtocol(Protocol):
         ...
 
 
+class SignatoryGenerations:
+    """
+    Process-wide generation numbers, one per key (e.g., per stamp), bumped whenever the key's signatories change
+    A memo recorded with an earlier generation for its key may be stale.
+    Only the `maxsize` most recently bumped keys are tracked; any other key reports the latest generation forgotten,
+        which may cause an extra re-evaluation, but never lets a stale memo be used.
+    The None key is bumped along with every other key, for strategies that can't tell whose signatories they match.
+    Not thread-safe: concurrent bumps from several threads in one process may lose a key's latest generation.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._generations = OrderedDict()
+        self._counter = count(1)
+        self._latest = 0
+        self._forgotten = 0
+
+    def __len__(self):
+        return len(self._generations)
+
+    def get(self, key) -> int:
+        """Return the current generation for the given key"""
+        if key is None:
+            return self._latest
+        return self._generations.get(key, self._forgotten)
+
+    def bump(self, key) -> int:
+        """Start a new generation for the given key - return the new generation"""
+        self._latest = generation = next(self._counter)
+        if key is not None:
+            self._generations.pop(key, None)
+            self._generations[key] = generation
+            if len(self._generations) > self.maxsize:
+                _, self._forgotten = self._generations.popitem(last=False)
+        return generation
+
+
 class SigningOrderPatternMatcher:
     """
     Ordering Strategy: match a pattern of Signoff Types defining a "signing order" against a signets queryset.
@@ -46,21 +110,77 @@ class SigningOrderPatternMatcher:
     match result object can answer questions like:
         - does the sequence of signoffs satisfy the pattern defined; and
         - what SignoffType(s) could be added to the sequence next?
+    The match result is memoized until a signoff on the same stamp is signed or revoked through the signoffs API
+        - call `invalidate()` if signets are added or revoked by other means.
     """
 
-    def __init__(self, pattern: pm.SigningOrderPattern, signets_queryset):
+    # Bumped for a stamp whenever a signoff on it is signed or revoked - memos from an earlier generation may be stale.
+    generations = SignatoryGenerations()
+
+    def __init__(self, pattern: pm.SigningOrderPattern, signets_queryset, stamp=None):
         """
         Match the signets queryset against the Singing Order pattern
         signet_set must be ordered chronologically (by timestamp), which is default ordering for Signet
+        stamp, if given, owns the signets - only signoffs signed or revoked on that stamp invalidate memoized results.
         """
         validate_signing_order_pattern(pattern)
         self.pattern = pattern
         self.signets_queryset = signets_queryset
+        self.stamp = stamp
+        self._matches = {}  # memo: find_next -> pm.MatchResult
+        self._generation = self.get_generation()
+
+    @property
+    def generation_key(self):
+        """Identifies whose signatories are matched: the stamp, if any, otherwise None, which any change invalidates"""
+        if self.stamp is None:
+            return None
+        return self.stamp._meta.label_lower, self.stamp.pk
+
+    def get_generation(self):
+        """Return (key, generation) for this strategy's signatories"""
+        key = self.generation_key
+        return key, self.generations.get(key)
+
+    def is_stale(self):
+        """Return True iff a signoff was signed or revoked on the stamp since the memoized results were computed"""
+        return self._generation != self.get_generation()
+
+    def get_match(self, find_next=True):
+        """Return the memoized pm.MatchResult for pattern against queryset; a full match also serves find_next=False"""
+        if self.is_stale():
+            self.invalidate()
+        match = self._matches.get(True) or self._matches.get(find_next)
+        if match is None:
+            match = self._matches[find_next] = self.pattern.match(
+                *list(self.signets_queryset), find_next=find_next
+            )
+        return match
 
     @property
     def match(self):
-        """Return a pm.MatchResult object for matching pattern against queryset (lazy evaluation)"""
-        return self.pattern.match(*list(self.signets_queryset))
+        """Return a pm.MatchResult object for matching pattern against queryset (lazy evaluation, memoized)"""
+        return self.get_match()
+
+    def invalidate(self):
+        """Discard the memoized match result and signets, so they are re-evaluated on next access"""
+        self._matches = {}
+        self.signets_queryset = self.signets_queryset.all()
+        self._generation = self.get_generation()
+
+    def signatories_changed(self):
+        """Start a new generation, so memoized results of every strategy object for this stamp are re-evaluated"""
+        self.generations.bump(self.generation_key)
+
+    def signoff_signed(self, signoff):
+        """The sequence of signoffs changed - invalidate memoized matches"""
+        self.signatories_changed()
+        self.invalidate()
+
+    def signoff_revoked(self, signoff):
+        """The sequence of signoffs changed - invalidate memoized matches"""
+        self.signatories_changed()
+        self.invalidate()
 
     def next_signoffs(self) -> list[AbstractSignoff]:
         """Return a list of the next Signoff Type(s) available for signing in this signing order"""
@@ -68,7 +188,143 @@ class SigningOrderPatternMatcher:
 
     def is_complete(self) -> bool:
         """Return True iff this signing order is complete (all required signoffs have been signed)"""
-        return self.match.is_complete
+        return self.get_match(find_next=False).is_complete
+
+
+class PersistedSigningOrderPatternMatcher(SigningOrderPatternMatcher):
+    """
+    Ordering Strategy: a pattern matcher that persists its automaton state on the approval Stamp.
+
+    Implements SigningOrderStrategyProtocol
+    `next_signoffs()` and `is_complete()` are answered from the stamp's `signing_order_state`, without fetching signets.
+    The state is advanced by one automaton step when a signoff is signed, and rebuilt from the remaining signets
+        when a signoff is revoked.  Missing or stale state (e.g., after the pattern changed) is rebuilt on access.
+    Requires the "automaton" pattern matching backend, and a Stamp model with a `signing_order_state` field
+        - see `SigningOrderStateMixin`.
+    """
+
+    def __init__(self, pattern: pm.SigningOrderPattern, signets_queryset, stamp):
+        """Match the signets queryset against the Signing Order pattern, persisting the match state on stamp"""
+        try:
+            type(stamp)._meta.get_field("signing_order_state")
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                f"SigningOrder: persist_state requires a signing_order_state field on {type(stamp).__name__} "
+                "- add SigningOrderStateMixin to the Stamp model, and make a migration."
+            ) from None
+        super().__init__(pattern, signets_queryset, stamp=stamp)
+        self._state = None  # memo: (state, count)
+        self._refresh = False  # True iff the stamp's persisted state may have been changed by another object
+
+    @property
+    def automaton(self):
+        """The automaton_match.PatternMatcher that provides state transitions for the pattern"""
+        return self.pattern.pattern_matcher
+
+    @cached_property
+    def fingerprint(self):
+        """Identifies the pattern, including the token strings interned in the codes the automaton works on"""
+        key = json.dumps([self.automaton.fingerprint, self.pattern.token_alphabet.tokens])
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def _load(self):
+        """Return the (state, count) persisted on the stamp, or None if there is no valid persisted state"""
+        try:
+            data = json.loads(self.stamp.signing_order_state)
+            if data["pattern"] == self.fingerprint:
+                return self.automaton.loads_state(data["state"]), data["count"]
+        except (TypeError, ValueError, KeyError, IndexError):
+            pass
+        return None
+
+    def _lock(self):
+        """Lock the stamp row, for the rest of the transaction, and return its persisted (state, count), or None"""
+        self.stamp.signing_order_state = (
+            type(self.stamp)
+            .objects.select_for_update()
+            .filter(pk=self.stamp.pk)
+            .values_list("signing_order_state", flat=True)
+            .first()
+        )
+        return self._load()
+
+    def _store(self, state, count):
+        """Persist the given state on the stamp, with a single UPDATE query if the stamp is saved"""
+        self.stamp.signing_order_state = json.dumps(
+            dict(
+                pattern=self.fingerprint,
+                state=self.automaton.dumps_state(state),
+                count=count,
+            ),
+            separators=(",", ":"),
+        )
+        if self.stamp.pk:
+            type(self.stamp).objects.filter(pk=self.stamp.pk).update(
+                signing_order_state=self.stamp.signing_order_state
+            )
+        self._state = (state, count)
+        self._refresh = False
+        return self._state
+
+    @property
+    def state(self):
+        """Return the current (state, count) for this signing order, rebuilding it from signets if necessary"""
+        if self.is_stale():
+            self.invalidate()
+        if self._state is None:
+            if self._refresh and self.stamp.pk:
+                self.stamp.refresh_from_db(fields=["signing_order_state"])
+            self._refresh = False
+            self._state = self._load() or self.rebuild()
+        return self._state
+
+    def rebuild(self):
+        """Consistency repair: re-match the signets from scratch and persist the resulting state on the stamp"""
+        to_str = self.pattern.token_repr.to_str
+        tokens = self.pattern.token_alphabet.encode_all(to_str(s) for s in self.signets_queryset.all())
+        return self._store(self.automaton.run(tokens), len(tokens))
+
+    def invalidate(self):
+        """Discard memoized results, so they are re-loaded from the stamp on next access"""
+        super().invalidate()
+        self._state = None
+        self._refresh = True
+
+    def signoff_signed(self, signoff):
+        """
+        Advance the persisted state by one step for the given, newly signed, signoff
+        Steps only from a valid persisted state that counts every signet but the new one - otherwise the state is
+            rebuilt from the signets, which already include the new one.  The stamp row is locked while its state is
+            read and written, so concurrent signers can't overwrite each other's step.
+        """
+        super().signoff_signed(signoff)
+        with transaction.atomic():
+            persisted = self._lock()
+            if persisted is None or persisted[1] + 1 != self.signets_queryset.count():
+                self.rebuild()
+            else:
+                state, count = persisted
+                token = self.pattern.token_alphabet.encode(self.pattern.token_repr.to_str(signoff.signet))
+                self._store(self.automaton.step(state, token), count + 1)
+
+    def signoff_revoked(self, signoff):
+        """Step the persisted state back, by rebuilding it from the remaining signets"""
+        super().signoff_revoked(signoff)
+        self.rebuild()
+
+    def next_signoffs(self) -> list[AbstractSignoff]:
+        """Return a list of the next Signoff Type(s) available for signing in this signing order"""
+        state, _ = self.state
+        decode = self.pattern.token_alphabet.decode
+        return [
+            self.pattern.token_repr.pattern_from_str(decode(t))
+            for t in self.automaton.next_tokens[state]
+        ]
+
+    def is_complete(self) -> bool:
+        """Return True iff this signing order is complete (all required signoffs have been signed)"""
+        state, count = self.state
+        return count > 0 and self.automaton.accepting[state]
 
 
 class SigningOrder:
@@ -80,7 +336,12 @@ class SigningOrder:
     default_strategy_class = SigningOrderPatternMatcher  # default service is a general-purpose pattern matcher
 
     def __init__(
-        self, *pattern, signet_set_accessor="signatories", strategy_class=None
+        self,
+        *pattern,
+        signet_set_accessor="signatories",
+        strategy_class=None,
+        backend=None,
+        persist_state=False,
     ):
         """
         This descriptor injects a `SigningOrderStrategyProtocol` object to manage the signing order for the owner's `signet_set`
@@ -90,32 +351,142 @@ class SigningOrder:
         `pattern` is passed directly through to the `strategy_class` constructor, so could, in theory, be anything.
         `signet_set_accessor` is string with name of callable or attribute for a `Signet` manager on that owner instance.
         `strategy_class` allows this descriptor to be re-used with other ordering strategies
+        `backend` names the pattern matching backend, e.g. "regex" or "automaton" (faster for large InParallel patterns)
+            - default is the SIGNOFFS_SIGNING_ORDER_BACKEND setting.
+        `persist_state` opts in to keeping the signing order state on the owner's `stamp` (implies "automaton" backend)
+            - owner must have a `stamp` with a `signing_order_state` field (see `SigningOrderStateMixin`, which
+              needs a migration), and the default strategy is a persisted one.
         """
-        pattern = pm.InSeries(*pattern)
+        self.persist_state = persist_state
+        pattern = pm.InSeries(
+            *pattern, backend="automaton" if persist_state else backend
+        )
         validate_signing_order_pattern(pattern)
         self.pattern = pattern
         self.signet_set_accessor = signet_set_accessor
-        self.strategy_class = strategy_class or self.default_strategy_class
+        self.attr_name = ""  # set by __set_name__
+        self.strategy_class = strategy_class or (
+            PersistedSigningOrderPatternMatcher
+            if persist_state
+            else self.default_strategy_class
+        )
 
     def get_service_instance(self, owner_instance):
         """Return an instance of the `strategy_class` for the given owner instance"""
         signet_set_accessor = getattr(owner_instance, self.signet_set_accessor)
+        kwargs = (
+            dict(stamp=getattr(owner_instance, "stamp", None))
+            if issubclass(self.strategy_class, SigningOrderPatternMatcher)
+            else {}
+        )
         return self.strategy_class(
-            pattern=self.pattern, signets_queryset=signet_set_accessor.all()
+            pattern=self.pattern, signets_queryset=signet_set_accessor.all(), **kwargs
+        )
+
+    def evaluate_histories(self, histories: dict) -> dict:
+        """
+        Return a `SigningOrderState` for each sequence of signoff ids in histories dict, keyed the same as histories.
+        Each distinct sequence is matched only once, no matter how many keys share it.
+        """
+        states = {}
+        for history in set(histories.values()):
+            match = self.pattern.match_strs(history)
+            states[history] = SigningOrderState(match.is_complete, match.next)
+        return {key: states[history] for key, history in histories.items()}
+
+    def evaluate_many(self, stamps) -> dict:
+        """
+        Return a `SigningOrderState` for each of the given stamps, keyed by stamp id, in bulk
+        Signets for all stamps are fetched in one query, then matched in memory, so no strategy object is involved
+            - useful to find, e.g., every approval awaiting a given signoff, but only for pattern-based strategies.
+        """
+        from signoffs.core.models.stamps import signet_histories
+
+        stamps = list(stamps)
+        histories = signet_histories(stamps)
+        return self.evaluate_histories(
+            {stamp.pk: histories.get(stamp.pk, ()) for stamp in stamps}
         )
 
+    def __set_name__(self, owner, name):
+        self.attr_name = name
+
     def __get__(self, instance, owner=None):
         """
         Instantiate and return a `strategy_class` instance to provide SigningOrder services for the owning instance
+
+        The strategy object is memoized on the owning instance, and memoizes its own match results until a signoff
+            on the owner's stamp is signed or revoked - see `SigningOrderPatternMatcher.invalidate`.
         """
         if instance is None:  # class access - nada - nothing useful?
             return self
-        else:  # instance access - return the ordering strategy object
-            return self.get_service_instance(instance)
+        else:  # instance access - return the ordering strategy object, and replace descriptor with it.
+            strategy = self.get_service_instance(instance)
+            if self.attr_name:
+                setattr(instance, self.attr_name, strategy)
+            return strategy
+
+
+class CompileReport(NamedTuple):
+    """Diagnostics for compiling one Approval Type's signing order - see `compile_signing_orders`"""
+
+    approval_id: str
+    backend: str
+    compile_time: float  # seconds
+    size: int  # backend-specific measure, e.g., length of regex or number of DFA states
+    cached: bool = False  # True iff the compiled pattern was loaded from the on-disk compiled_cache
+
+
+def compile_signing_orders(fresh: bool = False) -> list[CompileReport]:
+    """
+    Compile the signing order pattern for every registered Approval Type, return a `CompileReport` for each
+    A pattern shared by several Approval Types is only compiled once (compile_time is ~0 for subsequent types).
+    fresh=True times a fresh compile of each pattern, bypassing the compiled pattern cached on it and the
+    compiled_cache - use it to measure compile times once signing orders are already warmed up.
+    """
+    reports = []
+    for approval_id, approval_type in sorted(registry.approvals.items()):
+        signing_order = getattr(approval_type, "signing_order", None)
+        if not isinstance(signing_order, SigningOrder):
+            continue
+        pattern = signing_order.pattern
+        cached = not fresh and "pattern_matcher" not in pattern.__dict__ and compiled_cache.is_cached(pattern)
+        start = time.perf_counter()
+        compiled = pattern.matcher_backend.compile(pattern) if fresh else pattern.pattern_matcher
+        compile_time = time.perf_counter() - start
+        reports.append(
+            CompileReport(
+                approval_id,
+                pattern.backend or pm.backends.SIGNOFFS_SIGNING_ORDER_BACKEND,
+                compile_time,
+                pattern.matcher_backend.size(compiled),
+                cached,
+            )
+        )
+    return reports
+
+
+def warm_up_signing_orders() -> list[CompileReport]:
+    """Compile all signing orders, so requests don't pay to compile them, and log compile time and size of each"""
+    reports = compile_signing_orders()
+    for report in reports:
+        logger.info(
+            "Compiled signing order for %s (%s backend) in %.1f ms, size %d",
+            report.approval_id,
+            report.backend,
+            report.compile_time * 1000,
+            report.size,
+        )
+    return reports
 
 
 __all__ = [
+    "CompileReport",
+    "compile_signing_orders",
+    "warm_up_signing_orders",
     "SigningOrder",
+    "SigningOrderState",
     "SigningOrderStrategyProtocol",
     "SigningOrderPatternMatcher",
+    "PersistedSigningOrderPatternMatcher",
 ]
@@ -1,19 +1,28 @@
 """
 Signing Order pattern matching language. Defines the pattern for a Signing Order using Signoff Types
 
-Pattern Matching is backed by regex_match backend (currently not replaceable, but that'd be a nice idea :-)
+Pattern Matching is delegated to a pluggable backend (see backends), regex_match by default.
+The automaton_match backend is a faster alternative for patterns with large parallel groups or many distinct terms
+    - it finds the next tokens in the same single pass that matches the tokens - choose it with `backend="automaton"`,
+      or for all patterns with the SIGNOFFS_SIGNING_ORDER_BACKEND setting.
 """
 from __future__ import annotations
 from typing import TYPE_CHECKING
 import collections.abc
+import threading
+from collections import OrderedDict, namedtuple
 from functools import cached_property
 from itertools import chain
 from types import SimpleNamespace
 
+from django.core.exceptions import ImproperlyConfigured
+
 from signoffs import registry
+from signoffs.settings import SIGNOFFS_MATCH_CACHE_SIZE
 
+from . import analysis, automaton_match, backends, compiled_cache
 from .regex_match import (
-    PatternMatcher,
+    MatchResult,
     all_of,
     exactly_n,
     exactly_one,
@@ -49,16 +58,154 @@ signoff_repr = SimpleNamespace(
 )
 
 
-def regex_pattern(pattern: tuple[str | SigningOrderPattern], to_str: Callable[[object], str]):
+def regex_pattern(
+    pattern: tuple[str | SigningOrderPattern], to_str: Callable[[object], str], alphabet: TokenAlphabet = None
+):
     """Return the equivalent regex pattern matching function for given pattern"""
     # recurse nested patterns, stopping recursion when pattern is a simple object and returning its string rep.
     pattern = [
-        p.regex_pattern() if isinstance(p, SigningOrderPattern) else to_str(p)
+        p.regex_pattern(alphabet)
+        if isinstance(p, SigningOrderPattern)
+        else _token_str(p, to_str, alphabet)
         for p in pattern
     ]
     return pattern
 
 
+def automaton_pattern(
+    pattern: tuple[str | SigningOrderPattern], to_str: Callable[[object], str], alphabet: TokenAlphabet = None
+):
+    """Return the equivalent automaton pattern for given pattern"""
+    return [
+        p.automaton_pattern(alphabet)
+        if isinstance(p, SigningOrderPattern)
+        else _token_str(p, to_str, alphabet)
+        for p in pattern
+    ]
+
+
+def _token_str(obj, to_str: Callable[[object], str], alphabet: TokenAlphabet = None):
+    """Return the string rep. for a pattern object, interned in the given alphabet, if any"""
+    token_str = to_str(obj)
+    return alphabet.encode(token_str) if alphabet is not None else token_str
+
+
+#
+#  Token interning - matchers work on short codes, rather than long, deeply namespaced signoff ids.
+#
+
+
+class TokenAlphabet:
+    """
+    A compact alphabet for the token strings in one pattern - each token string is interned to a short code
+
+    Codes are short, valid regex group names that need no escaping, so the size of the compiled pattern
+        and of the strings matched against it no longer depend on the length of the signoff ids.
+    Token strings that don't appear in the pattern are all encoded as UNKNOWN, which no pattern term matches.
+    """
+
+    UNKNOWN = "_"
+
+    def __init__(self, token_strs):
+        """Intern the given token strings, in order, ignoring duplicates"""
+        self.tokens = list(dict.fromkeys(token_strs))
+        self._codes = {t: f"t{i}" for i, t in enumerate(self.tokens)}
+        self._tokens = {code: t for t, code in self._codes.items()}
+
+    def encode(self, token_str: str) -> str:
+        """Return the code for the given token string"""
+        return self._codes.get(token_str, self.UNKNOWN)
+
+    def encode_all(self, token_strs) -> list[str]:
+        """Return the list of codes for the given sequence of token strings"""
+        codes = self._codes
+        return [codes.get(t, self.UNKNOWN) for t in token_strs]
+
+    def decode(self, code: str) -> str:
+        """Return the token string for the given code"""
+        return self._tokens[code]
+
+    def decode_match(self, match: MatchResult) -> MatchResult:
+        """Translate a MatchResult over codes, in place, back to token strings - returns the match"""
+        match.matched = {
+            automaton_match.group_name(self._tokens[code]): [self._tokens[c] for c in captures]
+            for code, captures in match.matched.items()
+        }
+        match.next = [self._tokens[code] for code in match.next]
+        return match
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+#
+#  Process-wide cache of match results - many approvals share a signing order and sit in the same few states.
+#
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def copy_match(match: MatchResult) -> MatchResult:
+    """Return a copy of the match result that shares no mutable state with the original"""
+    return MatchResult(
+        is_valid=match.is_valid,
+        is_complete=match.is_complete,
+        matched={k: list(v) for k, v in match.matched.items()},
+        next=list(match.next),
+    )
+
+
+class MatchCache:
+    """
+    A thread-safe, bounded, least-recently-used cache of MatchResults, keyed by (pattern, token strings, find_next)
+
+    Results are copied on the way in and on the way out, so callers can't corrupt the cached results.
+    maxsize of 0 or None disables the cache.
+    """
+
+    def __init__(self, maxsize=SIGNOFFS_MATCH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None if it is not cached"""
+        with self._lock:
+            match = self._results.get(key)
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._results.move_to_end(key)
+        return copy_match(match)
+
+    def put(self, key, match: MatchResult):
+        """Cache a copy of the match result for key, evicting the least recently used result if cache is full"""
+        if not self.maxsize:
+            return
+        match = copy_match(match)
+        with self._lock:
+            self._results[key] = match
+            self._results.move_to_end(key)
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        """Return the cache statistics, like functools.lru_cache.cache_info()"""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._results))
+
+    def clear(self):
+        """Empty the cache and reset its statistics"""
+        with self._lock:
+            self._results.clear()
+            self.hits = self.misses = 0
+
+
+match_cache = MatchCache()
+
+
 # Singing Order Pattern Specifiers
 
 
@@ -67,35 +214,110 @@ class SigningOrderPattern(collections.abc.Sequence):
     A abstract pattern is a hierarchically nested sequence of terms used to match a concrete linear sequence of tokens
     Terms for a Signing Order are Signoff Type classes and tokens are signoff instances.
 
-    This class adapts the Signoff pattern and match API to the implementation provided by regex_match.PatternMatcher
+    This class adapts the Signoff pattern and match API to the implementation provided by a matcher backend
+        - see backends.MatcherBackend
     """
 
     regex_pattern_constructor = in_series
+    automaton_pattern_constructor = automaton_match.in_series
+    required_backend = None  # name of the only backend that can match this pattern, None if any backend can
 
-    def __init__(self, *pattern, token_repr=signoff_repr, **kwargs):
-        """Initialize with sequence of SigningOrderPattern objects (or any of its subclasses)"""
+    def __init__(self, *pattern, token_repr=signoff_repr, backend=None, **kwargs):
+        """
+        Initialize with sequence of SigningOrderPattern objects (or any of its subclasses)
+
+        `backend` names a registered pattern matching backend, e.g., "regex" or "automaton" - only used by the
+            outermost pattern.  Default is the SIGNOFFS_SIGNING_ORDER_BACKEND setting.
+        """
         self.pattern = pattern
         self.token_repr = token_repr
+        self.backend = backend
         self.kwargs = kwargs  # allow subclasses to pass arguments through to regex pattern constructors
 
     @cached_property
-    def pattern_matcher(self):
-        return PatternMatcher(self.regex_pattern())
+    def analysis(self) -> analysis.PatternAnalysis:
+        """Static properties of this pattern: min / max length, dead terms, and ambiguities - see analysis.analyze"""
+        return analysis.analyze(self)
+
+    @cached_property
+    def token_alphabet(self) -> TokenAlphabet:
+        """The compact alphabet that this pattern's token strings are interned to for matching"""
+        return TokenAlphabet(self.token_strs())
+
+    @cached_property
+    def matcher_backend(self) -> backends.MatcherBackend:
+        """The pattern matching backend used to match this pattern"""
+        return backends.get_backend(self.backend)
 
-    def regex_pattern(self):
-        """Return the equivalent regex pattern matching function for this pattern"""
+    @cached_property
+    def pattern_matcher(self):
+        """This pattern, compiled by its matcher backend - loaded from the on-disk compiled_cache, if enabled"""
+        return compiled_cache.load_or_compile(self)
+
+    def token_strs(self) -> list[str]:
+        """Return the unique token strings used in this pattern, in the order they appear in the pattern"""
+        token_strs = (
+            p.token_strs() if isinstance(p, SigningOrderPattern) else [self.token_repr.pattern_to_str(p)]
+            for p in self.pattern
+        )
+        return list(dict.fromkeys(chain.from_iterable(token_strs)))
+
+    def pattern_tree(self) -> list:
+        """Return a JSON-serializable representation of this pattern's structure, arguments, and token strings"""
+        return [
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            sorted(self.kwargs.items()),
+            [
+                p.pattern_tree() if isinstance(p, SigningOrderPattern) else self.token_repr.pattern_to_str(p)
+                for p in self.pattern
+            ],
+        ]
+
+    def regex_pattern(self, alphabet: TokenAlphabet = None):
+        """Return the equivalent regex pattern matching function for this pattern, with tokens interned in alphabet"""
         # TODO: replace with type(self).regex...
         construct = self.regex_pattern_constructor.__func__  # don't bind  self.
         return construct(
-            *regex_pattern(self.pattern, self.token_repr.pattern_to_str), **self.kwargs
+            *regex_pattern(self.pattern, self.token_repr.pattern_to_str, alphabet), **self.kwargs
+        )
+
+    def automaton_pattern(self, alphabet: TokenAlphabet = None):
+        """Return the equivalent automaton pattern for this pattern, with tokens interned in alphabet"""
+        construct = self.automaton_pattern_constructor.__func__  # don't bind  self.
+        return construct(
+            *automaton_pattern(self.pattern, self.token_repr.pattern_to_str, alphabet), **self.kwargs
         )
 
-    def match(self, *tokens):
-        """Returns a MatchResult object that compares iterable of tokens to this pattern"""
-        token_str = " ".join(self.token_repr.to_str(s) for s in tokens)
-        match = self.pattern_matcher.match(token_str)
-        if match.is_valid:
-            match.next = [self.token_repr.pattern_from_str(id) for id in match.next]
+    def match(self, *tokens, find_next=True):
+        """
+        Returns a MatchResult object that compares iterable of tokens to this pattern
+
+        Results are cached in the process-wide `match_cache`, keyed on this pattern and the sequence of tokens.
+        find_next=False skips finding the next tokens (match.next will be empty) - use when they are not needed.
+        """
+        return self.match_strs(
+            tuple(self.token_repr.to_str(s) for s in tokens), find_next=find_next
+        )
+
+    def match_strs(self, token_strs: tuple[str], find_next=True):
+        """
+        Returns a MatchResult object that compares tuple of token string representations to this pattern
+
+        The backend matches the tokens interned in this pattern's token_alphabet - results are translated back.
+        """
+        if self.analysis.exceeds_max_length(len(token_strs)):
+            return MatchResult()  # too many tokens to ever be valid - no need to run the matcher
+        key = (self, token_strs, find_next)
+        match = match_cache.get(key) if match_cache.maxsize else None
+        if match is None:
+            alphabet = self.token_alphabet
+            match = self.matcher_backend.match(
+                self.pattern_matcher, alphabet.encode_all(token_strs), find_next=find_next
+            )
+            if match.is_valid:
+                alphabet.decode_match(match)
+                match.next = [self.token_repr.pattern_from_str(id) for id in match.next]
+            match_cache.put(key, match)
         return match
 
     def __str__(self):
@@ -111,6 +333,13 @@ class SigningOrderPattern(collections.abc.Sequence):
         """Return a flat set of pattern terms used in this pattern"""
         return set(chain(t for term in self.pattern for t in term.terms()))
 
+    def subpatterns(self):
+        """Yield this pattern and every pattern nested in it"""
+        yield self
+        for term in self.pattern:
+            if isinstance(term, SigningOrderPattern):
+                yield from term.subpatterns()
+
 
 class TokenPattern(SigningOrderPattern):
     """Abstract base for simple, un-nested patterns specified by a single token."""
@@ -124,24 +353,28 @@ class ExactlyOne(TokenPattern):
     """A pattern that is complete when there is exactly one matching token"""
 
     regex_pattern_constructor = exactly_one
+    automaton_pattern_constructor = automaton_match.exactly_one
 
 
 class Optional(TokenPattern):
     """A pattern that matches zero or one optional token"""
 
     regex_pattern_constructor = zero_or_one
+    automaton_pattern_constructor = automaton_match.zero_or_one
 
 
 class ZeroOrMore(TokenPattern):
     """A pattern that matches zero or more matching tokens"""
 
     regex_pattern_constructor = zero_or_more
+    automaton_pattern_constructor = automaton_match.zero_or_more
 
 
 class OneOrMore(TokenPattern):
     """A pattern that is complete when there are one or more matching tokens"""
 
     regex_pattern_constructor = one_or_more
+    automaton_pattern_constructor = automaton_match.one_or_more
 
 
 class NTokenPattern(TokenPattern):
@@ -155,6 +388,7 @@ class ExactlyN(NTokenPattern):
     """A pattern that is complete with exactly n tokens"""
 
     regex_pattern_constructor = exactly_n
+    automaton_pattern_constructor = automaton_match.exactly_n
 
 
 class AtLeastN(NTokenPattern):
@@ -164,6 +398,7 @@ class AtLeastN(NTokenPattern):
     """
 
     regex_pattern_constructor = n_or_more
+    automaton_pattern_constructor = automaton_match.n_or_more
 
 
 # Pattern Sets
@@ -185,12 +420,14 @@ class AnyOneOf(PatternSet):
     """A pattern that matches any one of a set of alternate patterns"""
 
     regex_pattern_constructor = one_of
+    automaton_pattern_constructor = automaton_match.one_of
 
 
 class InSeries(PatternSet):
     """A pattern where tokens must be in sequential order"""
 
     regex_pattern_constructor = in_series
+    automaton_pattern_constructor = automaton_match.in_series
 
 
 class InParallel(PatternSet):
@@ -199,19 +436,49 @@ class InParallel(PatternSet):
     Notes:
         Experimental - only works for straight-forward, unambiguous cases.
         Terms from InSeries and AtLeastN patterns match sequential tokens, even when wrapped within InParallel
-          It may be possible to handle AtLeastN terms as non-sequential, but a look-ahead match algorithm is needed?
+          - use Interleaved for terms that match non-sequential tokens.
     """
 
     regex_pattern_constructor = all_of
+    automaton_pattern_constructor = automaton_match.all_of
+
+
+def interleave_not_supported(*lst, **kwargs):
+    """The regex backend has no way to express interleaved terms"""
+    raise ImproperlyConfigured(
+        "Interleaved patterns require the automaton backend - e.g., SigningOrder(..., backend='automaton')"
+    )
+
+
+class Interleaved(PatternSet):
+    """
+    A pattern where all terms must be matched, with the tokens for each term interleaved in any order
+    E.g., Interleaved(AtLeastN(reviewer, n=3), InSeries(legal, counsel)) matches 3 or more reviewer signoffs
+        and a legal then a counsel signoff, in any order, with the legal and counsel signoffs not necessarily adjacent.
+    Notes:
+        Each term keeps its own counters (e.g., AtLeastN's remaining repetitions), so terms, including nested series,
+          match their own, not necessarily sequential, tokens.
+        Not greedy: where a token could advance more than one term, every choice is tracked, so a sequence
+          is valid iff some assignment of tokens to terms is valid.  Matching is linear in the number of tokens.
+        Requires the "automaton" backend - SigningOrder raises ImproperlyConfigured for any other backend.
+    """
+
+    regex_pattern_constructor = interleave_not_supported
+    automaton_pattern_constructor = automaton_match.interleave_of
+    required_backend = "automaton"
 
 
 __all__ = [
+    "TokenAlphabet",
+    "MatchCache",
+    "match_cache",
     "AnyOneOf",
     "AtLeastN",
     "ExactlyN",
     "ExactlyOne",
     "InParallel",
     "InSeries",
+    "Interleaved",
     "OneOrMore",
     "Optional",
 ]
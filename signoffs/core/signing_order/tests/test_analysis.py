@@ -0,0 +1,146 @@
+"""
+    Test Suite for static analysis of signing order patterns
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..analysis import analyze
+from ..signoff_pattern import (
+    AnyOneOf,
+    AtLeastN,
+    ExactlyN,
+    ExactlyOne,
+    InParallel,
+    InSeries,
+    Interleaved,
+    Optional,
+    ZeroOrMore,
+)
+from .test_signoff_pattern import A, B, C, obj_repr
+
+
+class PatternAnalysisTests(SimpleTestCase):
+    def test_length_bounds(self):
+        a = analyze(
+            InSeries(
+                ExactlyOne(A, token_repr=obj_repr),
+                Optional(B, token_repr=obj_repr),
+                ExactlyN(C, n=2, token_repr=obj_repr),
+                token_repr=obj_repr,
+            )
+        )
+        self.assertEqual((a.min_length, a.max_length), (3, 4))
+        a = analyze(
+            InSeries(
+                ExactlyOne(A, token_repr=obj_repr),
+                AtLeastN(B, n=2, token_repr=obj_repr),
+                token_repr=obj_repr,
+            )
+        )
+        self.assertEqual((a.min_length, a.max_length), (3, None))
+        a = analyze(
+            AnyOneOf(
+                ExactlyOne(A, token_repr=obj_repr),
+                ExactlyN(B, n=3, token_repr=obj_repr),
+                token_repr=obj_repr,
+            )
+        )
+        self.assertEqual((a.min_length, a.max_length), (1, 3))
+        a = analyze(ZeroOrMore(A, token_repr=obj_repr))
+        self.assertEqual((a.min_length, a.max_length), (1, None))
+
+    def test_dead_terms(self):
+        a = analyze(
+            InSeries(
+                ExactlyN(A, n=0, token_repr=obj_repr),
+                ExactlyOne(B, token_repr=obj_repr),
+                token_repr=obj_repr,
+            )
+        )
+        self.assertEqual(a.dead_terms, [A])
+        a = analyze(
+            InSeries(
+                ExactlyOne(A, token_repr=obj_repr),
+                ExactlyOne(B, token_repr=obj_repr),
+                token_repr=obj_repr,
+            )
+        )
+        self.assertEqual(a.dead_terms, [])
+
+    def test_unambiguous(self):
+        for pattern in (
+            InSeries(
+                ExactlyOne(A, token_repr=obj_repr),
+                AtLeastN(B, n=2, token_repr=obj_repr),
+                ExactlyOne(C, token_repr=obj_repr),
+                token_repr=obj_repr,
+            ),
+            InParallel(
+                ExactlyOne(A, token_repr=obj_repr),
+                AtLeastN(B, n=1, token_repr=obj_repr),
+                token_repr=obj_repr,
+            ),
+            Interleaved(
+                AtLeastN(A, n=2, token_repr=obj_repr),
+                InSeries(
+                    ExactlyOne(B, token_repr=obj_repr),
+                    ExactlyOne(C, token_repr=obj_repr),
+                    token_repr=obj_repr,
+                ),
+                token_repr=obj_repr,
+            ),
+        ):
+            self.assertFalse(analyze(pattern).is_ambiguous, pattern)
+
+    def test_ambiguous(self):
+        for pattern in (
+            InSeries(
+                AtLeastN(A, n=1, token_repr=obj_repr),
+                ExactlyOne(A, token_repr=obj_repr),
+                token_repr=obj_repr,
+            ),
+            InSeries(
+                ExactlyOne(A, token_repr=obj_repr),
+                Optional(B, token_repr=obj_repr),
+                ExactlyOne(B, token_repr=obj_repr),
+                token_repr=obj_repr,
+            ),
+            InParallel(
+                ExactlyOne(A, token_repr=obj_repr),
+                AtLeastN(A, n=1, token_repr=obj_repr),
+                token_repr=obj_repr,
+            ),
+            AnyOneOf(
+                ExactlyOne(A, token_repr=obj_repr),
+                InSeries(
+                    ExactlyOne(A, token_repr=obj_repr),
+                    ExactlyOne(B, token_repr=obj_repr),
+                    token_repr=obj_repr,
+                ),
+                token_repr=obj_repr,
+            ),
+            Interleaved(
+                AtLeastN(A, n=2, token_repr=obj_repr),
+                ExactlyOne(A, token_repr=obj_repr),
+                token_repr=obj_repr,
+            ),
+        ):
+            self.assertTrue(analyze(pattern).is_ambiguous, pattern)
+
+    def test_analysis_is_cached(self):
+        pattern = InSeries(ExactlyOne(A, token_repr=obj_repr), token_repr=obj_repr)
+        self.assertIs(pattern.analysis, pattern.analysis)
+
+    def test_match_short_circuits(self):
+        pattern = InSeries(
+            ExactlyOne(A, token_repr=obj_repr),
+            Optional(B, token_repr=obj_repr),
+            token_repr=obj_repr,
+        )
+        with mock.patch.object(
+            type(pattern.matcher_backend), "match", side_effect=AssertionError
+        ):
+            m = pattern.match(A(), B(), B())
+        self.assertFalse(m.is_valid)
+        self.assertTrue(pattern.match(A(), B()).is_complete)
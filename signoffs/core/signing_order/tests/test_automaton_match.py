@@ -0,0 +1,256 @@
+"""
+    Test Suite for automaton_match pattern matching backend
+"""
+import time
+
+from django.test import SimpleTestCase
+
+from .. import regex_match
+from ..automaton_match import (
+    PatternMatcher,
+    all_of,
+    exactly_n,
+    exactly_one,
+    in_series,
+    interleave_of,
+    n_or_more,
+    one_of,
+    one_or_more,
+    zero_or_more,
+    zero_or_one,
+)
+
+
+class AutomatonPatternMatcherTests(SimpleTestCase):
+    def assertMatch(self, m, is_valid, is_complete, next):
+        self.assertEqual(m.is_valid, is_valid)
+        self.assertEqual(m.is_complete, is_complete)
+        self.assertSetEqual(set(m.next), set(next))
+
+    def test_0(self):
+        matcher = PatternMatcher(one_or_more("ABC"))
+        m = matcher.match("")
+        self.assertMatch(m, True, False, ["ABC"])
+        m = matcher.match("ABC")
+        self.assertMatch(m, True, True, ["ABC"])
+        m = matcher.match("ABC ABC")
+        self.assertMatch(m, True, True, ["ABC"])
+
+    def test_1(self):
+        matcher = PatternMatcher(one_or_more("A-B.C"))
+        m = matcher.match("A-B.C")
+        self.assertMatch(m, True, True, ["A-B.C"])
+        m = matcher.match("A-B.C ")
+        self.assertMatch(m, True, True, ["A-B.C"])
+        m = matcher.match("B")
+        self.assertMatch(m, False, False, [])
+
+    def test_2(self):
+        matcher = PatternMatcher(n_or_more("A*B.xy", 2))
+        m = matcher.match("A*B.xy")
+        self.assertMatch(m, True, False, ["A*B.xy"])
+        m = matcher.match("A*B.xy A*B.xy")
+        self.assertMatch(m, True, True, ["A*B.xy"])
+        m = matcher.match("A*B.xy A*B.xy ")
+        self.assertMatch(m, True, True, ["A*B.xy"])
+        m = matcher.match("A*B.xy A*B.xy B*B.xy ")
+        self.assertMatch(m, False, False, [])
+        m = matcher.match("B A*B.xy A*B.xy")
+        self.assertMatch(m, False, False, [])
+
+    def test_3(self):
+        matcher = PatternMatcher(exactly_one("A.B"))
+        m = matcher.match("A.B ")
+        self.assertMatch(m, True, True, [])
+        m = matcher.match("A.B")
+        self.assertMatch(m, True, True, [])
+        m = matcher.match(".B")
+        self.assertMatch(m, False, False, [])
+
+    def test_4(self):
+        matcher = PatternMatcher(exactly_n("A", 2))
+        m = matcher.match("A")
+        self.assertMatch(m, True, False, ["A"])
+        m = matcher.match("A A")
+        self.assertMatch(m, True, True, [])
+        m = matcher.match("B")
+        self.assertMatch(m, False, False, [])
+
+    def test_5(self):
+        matcher = PatternMatcher(
+            in_series(one_or_more("A.B"), exactly_one("B-B"), n_or_more("C*C", 2))
+        )
+        m = matcher.match("A.B")
+        self.assertMatch(m, True, False, ["A.B", "B-B"])
+        m = matcher.match("A.B B-B")
+        self.assertMatch(m, True, False, ["C*C"])
+        m = matcher.match("A.B A.B B-B")
+        self.assertMatch(m, True, False, ["C*C"])
+        m = matcher.match("A.B A.B B-B C*C C*C")
+        self.assertMatch(m, True, True, ["C*C"])
+        m = matcher.match("B")
+        self.assertMatch(m, False, False, [])
+
+    def test_6(self):
+        matcher = PatternMatcher(
+            all_of(one_or_more("A"), exactly_one("B"), n_or_more("C", 2))
+        )
+        m = matcher.match("A")
+        self.assertMatch(m, True, False, ["A", "B", "C"])
+        m = matcher.match("B")
+        self.assertMatch(m, True, False, ["A", "C"])
+        m = matcher.match("C")
+        self.assertMatch(m, True, False, ["C"])
+        m = matcher.match("C B A")
+        self.assertMatch(m, False, False, [])
+        m = matcher.match("B C C A A")
+        self.assertMatch(m, True, True, ["A"])
+        m = matcher.match("C C A B")
+        self.assertMatch(m, True, True, [])
+        m = matcher.match("B C A B")
+        self.assertMatch(m, False, False, [])
+
+    def test_7(self):
+        matcher = PatternMatcher(
+            all_of(one_or_more("A"), in_series(exactly_one("B"), n_or_more("C", 2)))
+        )
+        m = matcher.match("A")
+        self.assertMatch(m, True, False, ["A", "B"])
+        m = matcher.match("B C")
+        self.assertMatch(m, True, False, ["C"])
+        m = matcher.match("C")
+        self.assertMatch(m, False, False, [])
+
+    def test_8(self):
+        matcher = PatternMatcher(
+            in_series(one_or_more("A"), all_of(exactly_one("B"), n_or_more("C", 2)))
+        )
+        m = matcher.match("A")
+        self.assertMatch(m, True, False, ["A", "B", "C"])
+        m = matcher.match("A A C")
+        self.assertMatch(m, True, False, ["C"])
+        m = matcher.match("A B C")
+        self.assertMatch(m, True, False, ["C"])
+        m = matcher.match("A C C B")
+        self.assertMatch(m, True, True, [])
+
+    def test_9(self):
+        matcher = PatternMatcher(
+            all_of(exactly_one("A"), n_or_more("B", 2), one_or_more("C"))
+        )
+        m = matcher.match("C B B B A")
+        self.assertMatch(m, True, True, [])
+
+    def test_10(self):
+        matcher = PatternMatcher(
+            one_of(exactly_one("A"), n_or_more("B", 2), one_or_more("C"))
+        )
+        m = matcher.match("A")
+        self.assertMatch(m, True, True, [])
+        m = matcher.match("B B")
+        self.assertMatch(m, True, True, ["B"])
+        m = matcher.match("C")
+        self.assertMatch(m, True, True, ["C"])
+        m = matcher.match("A B")
+        self.assertMatch(m, False, False, [])
+
+    def test_11(self):
+        matcher = PatternMatcher(zero_or_one("A"))
+        m = matcher.match("")
+        self.assertMatch(
+            m, True, False, ["A"]
+        )  # No pattern is complete without at least one token!
+        m = matcher.match("A")
+        self.assertMatch(m, True, True, [])
+        m = matcher.match("A A")
+        self.assertMatch(m, False, False, [])
+
+    def test_12(self):
+        matcher = PatternMatcher(zero_or_more("A"))
+        m = matcher.match("")
+        self.assertMatch(m, True, False, ["A"])
+        m = matcher.match("A")
+        self.assertMatch(m, True, True, ["A"])
+        m = matcher.match("A A")
+        self.assertMatch(m, True, True, ["A"])
+
+    def test_matched(self):
+        matcher = PatternMatcher(in_series(one_or_more("A.B"), exactly_one("C")))
+        regex_matcher = regex_match.PatternMatcher(
+            regex_match.in_series(
+                regex_match.one_or_more("A.B"), regex_match.exactly_one("C")
+            )
+        )
+        for token_str in ("", "A.B", "A.B A.B C", "C"):
+            self.assertEqual(
+                matcher.match(token_str).matched,
+                regex_matcher.match(token_str).matched,
+            )
+
+    def test_large_parallel(self):
+        terms = [f"T{i}" for i in range(12)]
+        start = time.perf_counter()
+        matcher = PatternMatcher(in_series(all_of(*terms), exactly_one("Z")))
+        m = matcher.match(" ".join(reversed(terms)))
+        self.assertMatch(m, True, False, ["Z"])
+        m = matcher.match(" ".join(terms[:5]))
+        self.assertMatch(m, True, False, terms[5:])
+        m = matcher.match(" ".join(terms + ["Z"]))
+        self.assertMatch(m, True, True, [])
+        m = matcher.match(" ".join(terms[:5] + terms[:1]))
+        self.assertMatch(m, False, False, [])
+        self.assertLess(time.perf_counter() - start, 5)
+
+    def test_dfa_is_cached(self):
+        matcher = PatternMatcher(all_of("A", "B", "C"))
+        matcher.match("A B C")
+        num_states = len(matcher.states)
+        matcher.match("A B C")
+        self.assertEqual(len(matcher.states), num_states)
+
+    def test_single_pass(self):
+        terms = [f"T{i}" for i in range(30)]
+        matcher = PatternMatcher(in_series(*(zero_or_more(t) for t in terms)))
+        history = [terms[i // 4] for i in range(40)]
+        m = matcher.match(" ".join(history))
+        self.assertMatch(m, True, True, terms[9:])
+        # one transition per token in history, none for probing the next tokens
+        self.assertLessEqual(sum(len(t) for t in matcher.transitions), len(history))
+
+    def test_without_next(self):
+        matcher = PatternMatcher(in_series(one_or_more("A"), exactly_one("B")))
+        m = matcher.match("A A", find_next=False)
+        self.assertMatch(m, True, False, [])
+        m = matcher.match("A B", find_next=False)
+        self.assertMatch(m, True, True, [])
+
+    def test_interleave_of(self):
+        # 3 or more reviewers, interleaved with a legal then a counsel signoff
+        matcher = PatternMatcher(
+            interleave_of(n_or_more("R", 3), in_series("L", "C"))
+        )
+        self.assertMatch(matcher.match(""), True, False, ["R", "L"])
+        self.assertMatch(matcher.match("R L R"), True, False, ["R", "C"])
+        self.assertMatch(matcher.match("R L R C"), True, False, ["R"])
+        self.assertMatch(matcher.match("L R R C R"), True, True, ["R"])
+        self.assertMatch(matcher.match("R R R R L C"), True, True, ["R"])
+        self.assertMatch(matcher.match("C R R R L"), False, False, [])
+        self.assertMatch(matcher.match("R L R C L"), False, False, [])
+
+    def test_interleave_ambiguous(self):
+        # "A" could advance either term - every choice is tracked, not just the greedy one.
+        matcher = PatternMatcher(interleave_of(in_series("A", "B"), n_or_more("A", 2)))
+        self.assertMatch(matcher.match("A A B"), True, False, ["A"])
+        self.assertMatch(matcher.match("A A B A"), True, True, ["A"])
+        self.assertMatch(matcher.match("A A A B"), True, True, ["A"])
+        self.assertMatch(matcher.match("B"), False, False, [])
+
+    def test_interleave_linear(self):
+        matcher = PatternMatcher(
+            interleave_of(n_or_more("R", 3), in_series("L", "C"), one_or_more("X"))
+        )
+        tokens = " ".join(["R", "X"] * 5000 + ["L", "C"])
+        start = time.perf_counter()
+        self.assertMatch(matcher.match(tokens), True, True, ["R", "X"])
+        self.assertLess(len(matcher.states), 20)  # counters saturate, so the DFA stays small
+        self.assertLess(time.perf_counter() - start, 5)
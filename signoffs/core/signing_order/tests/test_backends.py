@@ -0,0 +1,142 @@
+"""
+    Differential Test Suite for the pluggable pattern matching backends - every backend must agree with "regex"
+"""
+from itertools import product
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from .. import backends
+from ..signoff_pattern import (
+    AnyOneOf,
+    AtLeastN,
+    ExactlyN,
+    ExactlyOne,
+    InParallel,
+    InSeries,
+    OneOrMore,
+    Optional,
+    ZeroOrMore,
+    match_cache,
+)
+from . import test_signoff_pattern
+from .test_signoff_pattern import A, B, C, obj_repr
+
+REFERENCE_BACKEND = "regex"
+
+
+def pattern_corpus(backend):
+    """Return the patterns from test_signoff_pattern test cases, over the terms A, B, C, using the given backend"""
+    return [
+        ExactlyOne(A, backend=backend, token_repr=obj_repr),
+        Optional(A, backend=backend, token_repr=obj_repr),
+        ZeroOrMore(A, backend=backend, token_repr=obj_repr),
+        OneOrMore(A, backend=backend, token_repr=obj_repr),
+        AtLeastN(A, n=3, backend=backend, token_repr=obj_repr),
+        ExactlyN(A, n=3, backend=backend, token_repr=obj_repr),
+        InSeries(
+            ExactlyOne(A, token_repr=obj_repr),
+            Optional(A, token_repr=obj_repr),
+            ZeroOrMore(B, token_repr=obj_repr),
+            backend=backend,
+            token_repr=obj_repr,
+        ),
+        InSeries(
+            ExactlyOne(B, token_repr=obj_repr),
+            AtLeastN(A, n=2, token_repr=obj_repr),
+            AtLeastN(B, n=1, token_repr=obj_repr),
+            backend=backend,
+            token_repr=obj_repr,
+        ),
+        InParallel(
+            ExactlyOne(B, token_repr=obj_repr),
+            AtLeastN(A, n=2, token_repr=obj_repr),
+            AtLeastN(C, n=1, token_repr=obj_repr),
+            backend=backend,
+            token_repr=obj_repr,
+        ),
+        AnyOneOf(
+            ExactlyOne(B, token_repr=obj_repr),
+            OneOrMore(A, token_repr=obj_repr),
+            ExactlyN(C, n=2, token_repr=obj_repr),
+            backend=backend,
+            token_repr=obj_repr,
+        ),
+        InSeries(
+            InParallel(
+                ExactlyOne(A, token_repr=obj_repr),
+                AtLeastN(B, n=1, token_repr=obj_repr),
+                token_repr=obj_repr,
+            ),
+            ExactlyOne(C, token_repr=obj_repr),
+            AtLeastN(A, n=3, token_repr=obj_repr),
+            backend=backend,
+            token_repr=obj_repr,
+        ),
+    ]
+
+
+def token_sequences(max_length=5):
+    """Generate every sequence of A, B, C tokens up to max_length long"""
+    for n in range(max_length + 1):
+        yield from product((A(), B(), C()), repeat=n)
+
+
+class BackendRegistryTests(SimpleTestCase):
+    def test_default_backend(self):
+        self.assertIsInstance(backends.get_backend(), backends.RegexBackend)
+        self.assertIs(ExactlyOne(A).matcher_backend, backends.get_backend("regex"))
+
+    def test_select_backend(self):
+        pattern = ExactlyOne(A, token_repr=obj_repr, backend="automaton")
+        self.assertIsInstance(pattern.matcher_backend, backends.AutomatonBackend)
+        self.assertTrue(pattern.match(A()).is_complete)
+
+    def test_setting(self):
+        with mock.patch.object(backends, "SIGNOFFS_SIGNING_ORDER_BACKEND", "automaton"):
+            self.assertIsInstance(ExactlyOne(A).matcher_backend, backends.AutomatonBackend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ImproperlyConfigured):
+            backends.get_backend("no_such_backend")
+
+    def test_register_backend(self):
+        backend = backends.RegexBackend()
+        self.addCleanup(backends.backends.pop, "test_backend")
+        backends.register_backend("test_backend", backend)
+        self.assertIs(ExactlyOne(A, backend="test_backend").matcher_backend, backend)
+
+
+class DifferentialBackendTests(SimpleTestCase):
+    """Every registered backend must produce the same results as the reference backend for the same patterns"""
+
+    def setUp(self):
+        match_cache.clear()
+
+    def assertSameMatch(self, m, ref, msg):
+        self.assertEqual(m.is_valid, ref.is_valid, msg)
+        self.assertEqual(m.is_complete, ref.is_complete, msg)
+        self.assertSetEqual(set(m.next), set(ref.next), msg)
+
+    def test_backends_agree(self):
+        reference = pattern_corpus(REFERENCE_BACKEND)
+        for name in backends.backends:
+            if name == REFERENCE_BACKEND:
+                continue
+            for pattern, ref_pattern in zip(pattern_corpus(name), reference):
+                for tokens in token_sequences():
+                    msg = f"{name}: {pattern} <- {[type(t).__name__ for t in tokens]}"
+                    self.assertSameMatch(
+                        pattern.match(*tokens), ref_pattern.match(*tokens), msg
+                    )
+
+
+class AutomatonBackendSignoffPatternTests(test_signoff_pattern.SignoffPatternTests):
+    """Run the signoff pattern test cases with the automaton backend as the default"""
+
+    def setUp(self):
+        patcher = mock.patch.object(backends, "SIGNOFFS_SIGNING_ORDER_BACKEND", "automaton")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
@@ -0,0 +1,70 @@
+"""
+    Test Suite for the on-disk cache of compiled signing order patterns
+"""
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import compiled_cache
+from ..signoff_pattern import ExactlyOne, InSeries, OneOrMore, match_cache
+from .test_signoff_pattern import A, B, obj_repr
+
+
+def make_pattern(token_repr=obj_repr, backend=None):
+    return InSeries(
+        ExactlyOne(A, token_repr=token_repr),
+        OneOrMore(B, token_repr=token_repr),
+        backend=backend,
+        token_repr=token_repr,
+    )
+
+
+class CompiledCacheTests(SimpleTestCase):
+    def setUp(self):
+        match_cache.clear()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_dir = tmp_dir.name
+        patcher = mock.patch.object(compiled_cache, "SIGNOFFS_SIGNING_ORDER_CACHE_DIR", self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled(self):
+        with mock.patch.object(compiled_cache, "SIGNOFFS_SIGNING_ORDER_CACHE_DIR", None):
+            pattern = make_pattern()
+            self.assertTrue(pattern.match(A(), B()).is_complete)
+            self.assertFalse(compiled_cache.is_cached(pattern))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_load_from_cache(self):
+        for backend in ("regex", "automaton"):
+            self.assertTrue(make_pattern(backend=backend).match(A(), B()).is_complete)
+            pattern = make_pattern(backend=backend)
+            self.assertTrue(compiled_cache.is_cached(pattern))
+            with mock.patch.object(type(pattern.matcher_backend), "compile", side_effect=AssertionError):
+                self.assertTrue(pattern.match(A(), B(), B()).is_complete)
+                self.assertFalse(pattern.match(B()).is_valid)
+
+    def test_key_changes_with_pattern(self):
+        key = compiled_cache.cache_key(make_pattern())
+        self.assertEqual(compiled_cache.cache_key(make_pattern()), key)
+        self.assertNotEqual(compiled_cache.cache_key(make_pattern(backend="automaton")), key)
+        self.assertNotEqual(
+            compiled_cache.cache_key(InSeries(ExactlyOne(A, token_repr=obj_repr), token_repr=obj_repr)), key
+        )
+        # same pattern, different signoff ids
+        renamed = SimpleNamespace(**{**vars(obj_repr), "pattern_to_str": lambda obj: f"renamed.{obj.__name__}"})
+        self.assertNotEqual(compiled_cache.cache_key(make_pattern(token_repr=renamed)), key)
+        with mock.patch.object(compiled_cache.signoffs, "__version__", "0.0.0"):
+            self.assertNotEqual(compiled_cache.cache_key(make_pattern()), key)
+
+    def test_corrupt_cache_file(self):
+        pattern = make_pattern()
+        with open(compiled_cache.cache_path(pattern), "wb") as f:
+            f.write(b"not a pickle")
+        with self.assertLogs(compiled_cache.logger, "WARNING"):
+            self.assertTrue(pattern.match(A(), B()).is_complete)
+        self.assertIsNotNone(compiled_cache.load(make_pattern()))  # re-written with the compiled pattern
@@ -253,3 +253,12 @@ class RegexPatternMatcherTests(SimpleTestCase):
         self.assertMatch(m, True, True, ["A"])
         m = matcher.match("A A")
         self.assertMatch(m, True, True, ["A"])
+
+    def test_without_next(self):
+        matcher = PatternMatcher(in_series(one_or_more("A"), exactly_one("B")))
+        m = matcher.match("A A", find_next=False)
+        self.assertMatch(m, True, False, [])
+        m = matcher.match("A B", find_next=False)
+        self.assertMatch(m, True, True, [])
+        m = matcher.match("B", find_next=False)
+        self.assertMatch(m, False, False, [])
@@ -3,6 +3,7 @@
 """
 from types import SimpleNamespace
 
+from django.core.exceptions import ImproperlyConfigured
 from django.test import SimpleTestCase
 
 from ..signoff_pattern import (
@@ -12,11 +13,15 @@ from ..signoff_pattern import (
     ExactlyOne,
     InParallel,
     InSeries,
+    Interleaved,
+    MatchCache,
     OneOrMore,
     Optional,
     PatternSet,
     SigningOrderPattern,
+    TokenAlphabet,
     ZeroOrMore,
+    match_cache,
 )
 
 #
@@ -341,3 +346,138 @@ class SignoffPatternExampleUsageTests(SimpleTestCase):
             B(),
         )
         self.assertMatch(match, True, False, [B, C])
+
+
+class InterleavedPatternTests(SimpleTestCase):
+    def setUp(self):
+        self.pattern = InSeries(
+            Interleaved(
+                AtLeastN(A, n=2, token_repr=obj_repr),
+                InSeries(
+                    ExactlyOne(B, token_repr=obj_repr),
+                    ExactlyOne(C, token_repr=obj_repr),
+                    token_repr=obj_repr,
+                ),
+                token_repr=obj_repr,
+            ),
+            token_repr=obj_repr,
+            backend="automaton",
+        )
+
+    def test_interleaved(self):
+        m = self.pattern.match(A(), B(), A(), C())
+        self.assertTrue(m.is_complete)
+        self.assertEqual(m.next, [A])
+        m = self.pattern.match(B(), A())
+        self.assertTrue(m.is_valid)
+        self.assertFalse(m.is_complete)
+        self.assertSetEqual(set(m.next), {A, C})
+        self.assertFalse(self.pattern.match(C(), A(), B()).is_valid)
+
+    def test_terms(self):
+        self.assertEqual(self.pattern.terms(), {A, B, C})
+
+    def test_regex_backend_not_supported(self):
+        pattern = Interleaved(
+            ExactlyOne(A, token_repr=obj_repr), token_repr=obj_repr, backend="regex"
+        )
+        with self.assertRaises(ImproperlyConfigured):
+            pattern.match(A())
+
+
+class MatchCacheTests(SimpleTestCase):
+    def setUp(self):
+        match_cache.clear()
+        self.pattern = self.make_pattern()
+
+    @staticmethod
+    def make_pattern():
+        return InSeries(
+            ExactlyOne(A, token_repr=obj_repr),
+            OneOrMore(B, token_repr=obj_repr),
+            ExactlyOne(C, token_repr=obj_repr),
+            token_repr=obj_repr,
+        )
+
+    def test_cache_hits(self):
+        m1 = self.pattern.match(A(), B())
+        m2 = self.pattern.match(A(), B())
+        self.assertEqual(m1, m2)
+        self.assertEqual(match_cache.info().hits, 1)
+        self.assertEqual(match_cache.info().misses, 1)
+        # same tokens, different pattern
+        self.make_pattern().match(A(), B())
+        self.assertEqual(match_cache.info().misses, 2)
+
+    def test_cache_returns_copies(self):
+        m1 = self.pattern.match(A(), B())
+        m1.next.clear()
+        m1.matched.clear()
+        m1.is_valid = False
+        m2 = self.pattern.match(A(), B())
+        self.assertTrue(m2.is_valid)
+        self.assertEqual(set(m2.next), {B, C})
+        self.assertTrue(m2.matched)
+
+    def test_cache_size_limit(self):
+        cache = MatchCache(maxsize=2)
+        for i in range(3):
+            cache.put(i, self.pattern.match(*[B()] * i))
+        self.assertEqual(cache.info().currsize, 2)
+        self.assertIsNone(cache.get(0))  # least recently used is evicted
+        self.assertIsNotNone(cache.get(2))
+        self.assertEqual(cache.info().hits, 1)
+
+    def test_cache_disabled(self):
+        cache = MatchCache(maxsize=0)
+        cache.put("key", self.pattern.match(A()))
+        self.assertEqual(cache.info().currsize, 0)
+
+
+# Long, namespaced token strings, like real signoff ids
+NAMESPACE = "myapp.approval-process.signoff."
+long_repr = SimpleNamespace(
+    pattern_to_str=lambda obj: NAMESPACE + obj.__name__,
+    pattern_from_str=lambda name: globals()[name.rsplit(".", 1)[-1]],
+    to_str=lambda obj: NAMESPACE + type(obj).__name__,
+)
+
+
+class TokenAlphabetTests(SimpleTestCase):
+    def setUp(self):
+        match_cache.clear()
+        self.pattern = InSeries(
+            ExactlyOne(A, token_repr=long_repr),
+            InParallel(
+                ExactlyOne(B, token_repr=long_repr),
+                OneOrMore(C, token_repr=long_repr),
+                token_repr=long_repr,
+            ),
+            token_repr=long_repr,
+        )
+
+    def test_alphabet(self):
+        alphabet = self.pattern.token_alphabet
+        self.assertEqual(alphabet.tokens, [NAMESPACE + n for n in ("A", "B", "C")])
+        codes = alphabet.encode_all(alphabet.tokens)
+        self.assertEqual(len(set(codes)), 3)
+        self.assertEqual([alphabet.decode(c) for c in codes], alphabet.tokens)
+        self.assertEqual(alphabet.encode("not.in.pattern"), TokenAlphabet.UNKNOWN)
+
+    def test_compact_pattern(self):
+        compact = self.pattern.regex_pattern(self.pattern.token_alphabet)
+        self.assertLess(len(compact.regex), len(self.pattern.regex_pattern().regex) / 2)
+        self.assertNotIn(NAMESPACE, compact.regex)
+
+    def test_match_results_are_decoded(self):
+        for backend in ("regex", "automaton"):
+            self.pattern.backend = backend
+            self.pattern.__dict__.pop("matcher_backend", None)
+            self.pattern.__dict__.pop("pattern_matcher", None)
+            match_cache.clear()
+            m = self.pattern.match(A(), C())
+            self.assertTrue(m.is_valid)
+            self.assertEqual(set(m.next), {B, C})
+            self.assertEqual(m.matched["myappapprovalprocesssignoffC"], [NAMESPACE + "C"])
+            self.assertTrue(self.pattern.match(A(), C(), B()).is_complete)
+            self.assertFalse(self.pattern.match(A(), A()).is_valid)
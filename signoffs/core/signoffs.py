@@ -12,9 +12,11 @@ from typing import Callable, Optional, Type, Union, TYPE_CHECKING
 
 from django.apps import apps
 from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.db import transaction
+from django.db.models import Model
 from django.utils.text import slugify
 
-from signoffs.core import models, utils
+from signoffs.core import models, permissions, utils
 from signoffs.core.forms import SignoffFormsManager
 from signoffs.core.renderers import SignoffRenderer
 from signoffs.core.urls import SignoffUrlsManager
@@ -36,6 +38,17 @@ revoke_type = Union[str, Type[models.AbstractRevokedSignet]]
 #      a function with the same signature as the default implementations provided here...
 
 
+def notify_signet(signoff, hook_name):
+    """
+    Call the hook with given name on the signoff's signet, if the signet defines one.
+
+    Lets Signet models, e.g. Approval Signets, keep related state in sync as their signoffs are signed or revoked.
+    """
+    hook = getattr(signoff.signet, hook_name, None)
+    if callable(hook):
+        hook(signoff)
+
+
 def sign_signoff(signoff, user, commit=True, **kwargs):
     """
     Force signature onto given signoff for given user and save its signet, regardless of permissions or signoff state
@@ -54,15 +67,53 @@ def revoke_signoff(signoff, user, reason="", revokeModel=None, **kwargs):
     Force revoke the given signoff for user regardless of permissions or signoff state.
 
     @param revokeModel: if supplied, create record of revocation, otherwise just delete the signet.
+    A signoff that was already revoked is not counted again by any SignoffCounter.
     """
+    counted = models.is_counted(signoff.signet) and not signoff.signet.is_revoked()
     # always delete the signet to ensure any FK relations to signet are updated.
     signoff.signet.delete()
     signoff.signet.id = None
+    receipt = None
     if revokeModel:   # restore the signet if we are keeping a record of its revocation.
         signoff.signet.save()
-        return revokeModel.objects.create(
+        receipt = revokeModel.objects.create(
             signet=signoff.signet, user=user, reason=reason
         )
+    if counted:
+        models.update_signoff_counters([signoff.signet], -1)
+    notify_signet(signoff, "signoff_revoked")
+    return receipt
+
+
+def bulk_sign_signoffs(signoffs, commit=True, batch_size=None, signet_manager=None):
+    """
+    Force signatures onto given signoffs, regardless of permissions, and save their signets in bulk.
+
+    Each signoff's signet must already have its user.  Signet defaults are set and validated here, in a batch,
+        because signets are written with `bulk_create`, in chunks of batch_size, which bypasses `signet.save()`.
+    signet_manager is the manager (e.g., a related manager) used to create the signets - default: Signet.objects
+    Use commit=False to prepare the signets without saving.  Returns the list of signoffs.
+    """
+    signoffs = list(signoffs)
+    if not signoffs:
+        return signoffs
+    for signoff in signoffs:
+        signoff.signet.update(
+            defaults=True, **signoff.get_signet_defaults(signoff.signet.user)
+        )
+    signets = [signoff.signet for signoff in signoffs]
+    SignetModel = type(signets[0])
+    SignetModel.bulk_set_signet_defaults(signets)
+    for signet in signets:
+        signet.validate_bulk_save()
+    if commit:
+        signet_manager = signet_manager or SignetModel.objects
+        with transaction.atomic():
+            signet_manager.bulk_create(signets, batch_size=batch_size)
+            models.update_signoff_counters(signets, 1)
+            for signoff in signoffs:
+                notify_signet(signoff, "signoff_signed")
+    return signoffs
 
 
 class DefaultSignoffBusinessLogic:
@@ -113,7 +164,7 @@ class DefaultSignoffBusinessLogic:
         return (
             user is not None
             and user.id
-            and (user.has_perm(self.perm) if self.perm else True)
+            and (permissions.has_perm(user, self.perm) if self.perm else True)
         )
 
     def can_sign(self, signoff, user):
@@ -147,7 +198,7 @@ class DefaultSignoffBusinessLogic:
         return (
             False
             if self.revoke_perm is False
-            else user.has_perm(revoke_perm)
+            else permissions.has_perm(user, revoke_perm)
             if revoke_perm
             else True
         )
@@ -300,6 +351,69 @@ class AbstractSignoff:
         except SignetModel.DoesNotExist:
             return cls(**filters)
 
+    @classmethod
+    def get_many(cls, subjects_or_filters, key=None, queryset=None) -> dict:
+        """
+        Return dict of the saved signoff, or a new unsigned signoff, for each of many subjects, with a single query
+
+        `subjects_or_filters` is either an iterable of subjects - model instances the Signet Model has a single FK to -
+            or of filters that all name the same single signet field, e.g., `[{'article': a1}, {'article_id': 2}]`.
+        Dict is keyed by `key(subject_or_filter_value)` - default: the subject or filter value itself.
+        Raises `MultipleObjectsReturned` if more than one signoff matches any subject or filter.
+        """
+        SignetModel = cls.get_signetModel()
+        if queryset is None:
+            queryset = SignetModel.objects.all()
+        key = key or (lambda value: value)
+        items = list(subjects_or_filters)
+        if not items:
+            return {}
+        if isinstance(items[0], dict):
+            field_names = {name for filters in items for name in filters}
+            if len(field_names) != 1 or any(len(filters) != 1 for filters in items):
+                raise ValueError(
+                    f"get_many filters must all name the same single field, not {sorted(field_names)}"
+                )
+            field = SignetModel._meta.get_field(field_names.pop())
+            values = [value for filters in items for value in filters.values()]
+        else:
+            relations = SignetModel.get_object_relations(type(items[0]))
+            if len(relations) != 1:
+                raise ImproperlyConfigured(
+                    f"Signet Model {SignetModel.__name__} must have exactly one relation to {type(items[0]).__name__} "
+                    "- use filters to name the relation."
+                )
+            field = relations[0]
+            values = items
+
+        def pk(value):
+            return value.pk if isinstance(value, Model) else value
+
+        signets = {}
+        queryset = queryset.with_revoked_flag().filter(
+            signoff_id=cls.id, **{f"{field.name}__in": [pk(v) for v in values]}
+        )
+        for signet in queryset:
+            value_pk = getattr(signet, field.attname)
+            if value_pk in signets:
+                raise SignetModel.MultipleObjectsReturned(
+                    f"More than one {cls.id} signoff for {field.name} {value_pk}"
+                )
+            signets[value_pk] = signet
+
+        signoffs = {}
+        for value in values:
+            subject = value if isinstance(value, Model) else None
+            signet = signets.get(pk(value))
+            if signet is None:
+                initial = {field.name: value} if subject is not None else {field.attname: value}
+                signoffs[key(value)] = cls(subject=subject, **initial)
+            else:
+                if subject is not None:
+                    setattr(signet, field.name, subject)  # no need to fetch the related subject again
+                signoffs[key(value)] = signet.get_signoff(subject=subject)
+        return signoffs
+
     # Signoff Type behaviours
 
     @classmethod
@@ -309,6 +423,48 @@ class AbstractSignoff:
         signoff.sign_if_permitted(user=user)
         return signoff
 
+    @classmethod
+    def bulk_sign(
+        cls, users_or_signets, commit=True, batch_size=None, signet_manager=None, **kwargs
+    ):
+        """
+        Create and return a list of signoffs, one signed for each given user or unsigned signet (with its user set)
+
+        Permission to sign is checked once per distinct user - if any user is not permitted, or any signet is already
+            signed, raise `PermissionDenied` without saving anything.  Signets are saved with `bulk_create`,
+            in chunks of batch_size, unless this Signoff Type has a custom `sign_method`, which is called for each.
+        kwargs provide initial values for signets created for users - see `bulk_sign_signoffs` for other arguments.
+        """
+        signoffs = []
+        for item in users_or_signets:
+            if isinstance(item, models.AbstractSignet):
+                signoffs.append(cls(signet=item))
+            else:
+                signoff = cls(**kwargs)
+                signoff.signet.sign(item)
+                signoffs.append(signoff)
+
+        permitted = {}
+        for signoff in signoffs:
+            user = signoff.signet.user
+            key = user.pk if user is not None else None
+            if key not in permitted:
+                permitted[key] = cls.is_permitted_signer(user)
+            if signoff.signet.is_signed():
+                raise PermissionDenied(f"Attempt to sign signed Signet {signoff.signet}")
+            if not permitted[key]:
+                raise PermissionDenied(f"User {user} is not allowed to sign {signoff}")
+
+        if cls.logic.sign_method is not sign_signoff:  # a custom signing algorithm can't be bypassed
+            with transaction.atomic():
+                for signoff in signoffs:
+                    signoff.sign(signoff.signet.user, commit=commit)
+            return signoffs
+
+        return bulk_sign_signoffs(
+            signoffs, commit=commit, batch_size=batch_size, signet_manager=signet_manager
+        )
+
     # Signoff instance behaviours
 
     def __init__(self, signet=None, subject=None, **kwargs):
@@ -483,9 +639,15 @@ class AbstractSignoff:
             )
 
     def save(self, *args, **kwargs):
-        """Attempt to save a Signet with the provided associated data for this Signoff"""
+        """
+        Attempt to save a Signet with the provided associated data for this Signoff
+        Saving signs the signoff - any SignoffCounter that counts signoffs of this Type is updated,
+            and the signet is notified (see `notify_signet`), whatever sign_method did the signing.
+        """
         self.validate_save()
         self.signet.save(*args, **kwargs)
+        models.update_signoff_counters([self.signet], 1)
+        notify_signet(self, "signoff_signed")
         return self
 
     def is_signed(self):
@@ -517,8 +679,10 @@ class BaseSignoff(AbstractSignoff):
 
 
 __all__ = [
+    "notify_signet",
     "sign_signoff",
     "revoke_signoff",
+    "bulk_sign_signoffs",
     "AbstractSignoff",
     "BaseSignoff",
     "DefaultSignoffBusinessLogic",
@@ -12,6 +12,8 @@ from signoffs.core.models import (
     AbstractApprovalStamp,
     AbstractRevokedSignet,
     AbstractSignet,
+    SigningOrderStateMixin,
+    SignoffCounter,
 )
 from signoffs.core.models.fields import ApprovalField, SignoffField, SignoffSet
 from signoffs.core.signoffs import BaseSignoff
@@ -105,7 +107,7 @@ class InvalidModel(models.Model):
 # Concrete Stamp models
 
 
-class Stamp(AbstractApprovalStamp):
+class Stamp(AbstractApprovalStamp, SigningOrderStateMixin):
     pass
 
 
@@ -153,6 +155,8 @@ class LeaveRequest(models.Model):
     # One-to-Many "reverse" relation based on relation defined by LeaveSignet
     hr_signoffs = SignoffSet(hr_signoff_type)
     mngmt_signoffs = SignoffSet(mngmt_signoff_type)
+    # denormalized count of the hr signoffs, maintained by the signoffs API
+    hr_signoff_count = SignoffCounter(hr_signoff_type)
 
     # (2) a One-to-One "forward" approval relation (managed by the Approval.signing_order) (e.g., see approval tests)
     approval, approval_stamp = ApprovalField(LeaveApproval)
@@ -2,13 +2,21 @@
 App-independent tests for Approval models - no app logic
 """
 
+import json
+from io import StringIO
+from unittest import mock
+
 from django.core import exceptions
 from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.db import connection
 from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 
 import signoffs.core.signing_order as so
 from signoffs.core.approvals import ApprovalLogic, BaseApproval
-from signoffs.core.signoffs import SignoffLogic
+from signoffs.core.models.managers import SignoffSetManager
+from signoffs.core.signoffs import SignoffLogic, sign_signoff
 from signoffs.registry import approvals, register
 
 from . import fixtures
@@ -37,6 +45,29 @@ class UnrestrictedApproval(BaseApproval):
     )
 
 
+@register(id="signoffs.tests.persisted_approval")
+class PersistedStateApproval(BaseApproval):
+    """An UnrestrictedApproval with its signing order state persisted on the Stamp"""
+
+    stampModel = Stamp
+
+    first_signoff = UnrestrictedApproval.first_signoff
+    second_signoff = UnrestrictedApproval.second_signoff
+    final_signoff = UnrestrictedApproval.final_signoff
+
+    signing_order = so.SigningOrder(
+        first_signoff, so.AtLeastN(second_signoff, n=2), final_signoff, persist_state=True
+    )
+
+
+def sign_and_save(signoff, user, commit=True, **kwargs):
+    """A custom sign_method that saves the signoff itself"""
+    sign_signoff(signoff, user, commit=False)
+    if commit:
+        signoff.save(**kwargs)
+    return signoff
+
+
 def sign_all(approval, user):
     """Complete signatures on approval with given user, return list of signoffs made"""
     s = []
@@ -146,6 +177,18 @@ class SigningOrderTests(TestCase):
         self.assertEqual(len(next), 1)
         self.assertEqual(next[0].id, UnrestrictedApproval.second_signoff.id)
 
+    def test_interleaved_requires_automaton_backend(self):
+        pattern = (
+            UnrestrictedApproval.first_signoff,
+            so.Interleaved(UnrestrictedApproval.second_signoff, UnrestrictedApproval.final_signoff),
+        )
+        with self.assertRaises(exceptions.ImproperlyConfigured):
+            so.SigningOrder(*pattern)
+        with self.assertRaises(exceptions.ImproperlyConfigured):
+            so.SigningOrder(*pattern, backend="regex")
+        self.assertEqual(so.SigningOrder(*pattern, backend="automaton").pattern.backend, "automaton")
+        self.assertEqual(so.SigningOrder(*pattern, persist_state=True).pattern.backend, "automaton")
+
     def test_can_sign(self):
         u = self.unrestricted_user
         self.assertTrue(self.approval.can_sign(user=u))
@@ -165,6 +208,187 @@ class SigningOrderTests(TestCase):
         final.sign_if_permitted(user=u)
         self.assertTrue(self.approval.is_complete())
 
+    def test_match_is_memoized(self):
+        u = self.unrestricted_user
+        u.get_all_permissions()  # user's permissions cache is not under test
+        self.assertIs(self.approval.signing_order, self.approval.signing_order)
+        with self.assertNumQueries(1):
+            self.assertFalse(self.approval.is_complete())
+            self.approval.signing_order.next_signoffs()
+            self.assertTrue(self.approval.can_sign(user=u))
+            self.assertFalse(self.approval.ready_to_approve())
+
+    def test_memo_invalidated_by_signoffs_api(self):
+        u = self.unrestricted_user
+        self.assertEqual(
+            self.approval.next_signoff_types(), [UnrestrictedApproval.first_signoff]
+        )
+        # sign through a different approval instance, and a signoff with no subject
+        approval = Stamp.objects.get(pk=self.approval.stamp.pk).approval
+        UnrestrictedApproval.first_signoff(stamp=approval.stamp).sign(user=u)
+        self.assertEqual(
+            self.approval.next_signoff_types(), [UnrestrictedApproval.second_signoff]
+        )
+        self.approval.signoffs.latest().revoke(user=u)
+        self.assertEqual(
+            self.approval.next_signoff_types(), [UnrestrictedApproval.first_signoff]
+        )
+        SignoffSetManager(UnrestrictedApproval.first_signoff, self.approval.stamp.signatories).create(user=u)
+        self.assertEqual(
+            self.approval.next_signoff_types(), [UnrestrictedApproval.second_signoff]
+        )
+
+    def test_memo_invalidated_by_custom_sign_method(self):
+        u = self.unrestricted_user
+        first = UnrestrictedApproval.first_signoff
+        self.assertEqual(self.approval.next_signoff_types(), [first])
+        with mock.patch.object(first.logic, "sign_method", sign_and_save):
+            first(stamp=self.approval.stamp).sign(user=u)
+        self.assertEqual(
+            self.approval.next_signoff_types(), [UnrestrictedApproval.second_signoff]
+        )
+
+    def test_memo_kept_for_other_stamps(self):
+        u = self.unrestricted_user
+        self.assertFalse(self.approval.is_complete())
+        other = UnrestrictedApproval.create()
+        other.next_signoffs(for_user=u)[0].sign_if_permitted(user=u)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.approval.signing_order.next_signoffs(), [UnrestrictedApproval.first_signoff]
+            )
+
+
+class SignatoryGenerationsTests(SimpleTestCase):
+    def test_generations(self):
+        generations = so.SignatoryGenerations(maxsize=2)
+        self.assertEqual(generations.get("a"), 0)
+        a = generations.bump("a")
+        self.assertEqual(generations.get("a"), a)
+        self.assertEqual(generations.get("b"), 0)
+        self.assertEqual(generations.get(None), a)  # the None key changes with every key
+        a2 = generations.bump("a")
+        generations.bump("b")
+        generations.bump("c")
+        self.assertEqual(len(generations), 2)
+        # a forgotten key never reports a generation older than its last one
+        self.assertEqual(generations.get("a"), a2)
+        self.assertNotEqual(generations.get("d"), 0)
+
+
+class PersistedSigningOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = fixtures.get_user(perms=("some_perm",))
+
+    def setUp(self):
+        self.approval = PersistedStateApproval.create()
+
+    def sign_next(self, signoff_type=None):
+        next = self.approval.next_signoffs(for_user=self.user)
+        signoff = (
+            [s for s in next if s.id == signoff_type.id][0] if signoff_type else next[0]
+        )
+        return signoff.sign_if_permitted(user=self.user)
+
+    def test_state_is_persisted(self):
+        self.assertFalse(self.approval.is_complete())
+        self.sign_next()
+        self.sign_next()
+        self.sign_next()
+        self.sign_next(PersistedStateApproval.final_signoff)
+        stamp = Stamp.objects.get(pk=self.approval.stamp.pk)
+        self.assertTrue(stamp.signing_order_state)
+        approval = stamp.approval
+        with self.assertNumQueries(0):
+            self.assertTrue(approval.is_complete())
+            self.assertEqual(approval.signing_order.next_signoffs(), [])
+
+    def test_matches_signets(self):
+        order = UnrestrictedApproval.signing_order
+        for _ in range(3):
+            self.sign_next()
+            signets = list(self.approval.signatories.all())
+            self.assertEqual(
+                self.approval.signing_order.next_signoffs(),
+                order.pattern.match(*signets).next,
+            )
+            self.assertEqual(
+                self.approval.is_complete(), order.pattern.match(*signets).is_complete
+            )
+
+    def test_revoke_steps_back(self):
+        self.sign_next()
+        self.sign_next()
+        self.assertEqual(
+            self.approval.signing_order.next_signoffs(),
+            [PersistedStateApproval.second_signoff],
+        )
+        self.approval.signoffs.latest().revoke(user=self.user)
+        self.approval.signoffs.latest().revoke(user=self.user)
+        self.assertEqual(
+            self.approval.signing_order.next_signoffs(),
+            [PersistedStateApproval.first_signoff],
+        )
+        self.assertFalse(self.approval.is_complete())
+
+    def test_rebuild(self):
+        self.sign_next()
+        self.sign_next()
+        Stamp.objects.filter(pk=self.approval.stamp.pk).update(
+            signing_order_state="garbage"
+        )
+        approval = Stamp.objects.get(pk=self.approval.stamp.pk).approval
+        self.assertEqual(
+            approval.signing_order.next_signoffs(),
+            [PersistedStateApproval.second_signoff],
+        )
+        Stamp.objects.filter(pk=self.approval.stamp.pk).update(signing_order_state=None)
+        Stamp.objects.filter(pk=self.approval.stamp.pk).rebuild_signing_order_state()
+        self.assertIsNotNone(
+            Stamp.objects.get(pk=self.approval.stamp.pk).signing_order_state
+        )
+
+    def test_sign_without_valid_state(self):
+        first, second = PersistedStateApproval.first_signoff, PersistedStateApproval.second_signoff
+        stamp = Stamp.objects.get(pk=self.approval.stamp.pk)  # fresh stamp: state never read or stored
+        first(stamp=stamp).sign(user=self.user)
+        approval = Stamp.objects.get(pk=stamp.pk).approval
+        self.assertEqual(approval.signing_order.next_signoffs(), [second])
+        stale = json.dumps(dict(pattern="stale", state=0, count=1))
+        Stamp.objects.filter(pk=stamp.pk).update(signing_order_state=stale)
+        stamp = Stamp.objects.get(pk=stamp.pk)
+        second(stamp=stamp).sign(user=self.user)
+        approval = Stamp.objects.get(pk=stamp.pk).approval
+        self.assertEqual(approval.signing_order.next_signoffs(), [second])
+        self.assertEqual(json.loads(approval.stamp.signing_order_state)["count"], 2)
+
+    def test_concurrent_signers(self):
+        first, second = PersistedStateApproval.first_signoff, PersistedStateApproval.second_signoff
+        self.assertEqual(self.approval.signing_order.next_signoffs(), [first])
+        stamp = Stamp.objects.get(pk=self.approval.stamp.pk)
+        # another signer's step is stored after this stamp was loaded
+        first(stamp=Stamp.objects.get(pk=stamp.pk)).sign(user=self.user)
+        second(stamp=stamp).sign(user=self.user)
+        approval = Stamp.objects.get(pk=self.approval.stamp.pk).approval
+        self.assertEqual(approval.signing_order.next_signoffs(), [second])
+        self.assertEqual(json.loads(approval.stamp.signing_order_state)["count"], 2)
+
+    def test_sign_with_custom_sign_method(self):
+        first, second = PersistedStateApproval.first_signoff, PersistedStateApproval.second_signoff
+        self.assertEqual(self.approval.signing_order.next_signoffs(), [first])
+        with mock.patch.object(first.logic, "sign_method", sign_and_save):
+            first(stamp=self.approval.stamp).sign(user=self.user)
+        self.assertEqual(self.approval.signing_order.next_signoffs(), [second])
+        self.assertEqual(json.loads(self.approval.stamp.signing_order_state)["count"], 1)
+
+    def test_requires_state_field(self):
+        pattern = PersistedStateApproval.signing_order.pattern
+        with self.assertRaises(exceptions.ImproperlyConfigured):
+            so.PersistedSigningOrderPatternMatcher(
+                pattern, ApprovalSignoff.signetModel.objects.none(), stamp=OtherStamp()
+            )
+
 
 class ApprovalTests(TestCase):
     @classmethod
@@ -325,6 +549,28 @@ class ApprovalRevokeTests(TestCase):
             revoke_qs = signoff.get_revoked_signets_queryset()
             self.assertTrue(revoke_qs.filter(stamp=self.approval.stamp).exists())
 
+    def test_revoke_queries(self):
+        """Revoking an approval takes the same number of queries, regardless of how many signoffs it has"""
+        u = self.unrestricted_user
+        u.get_all_permissions()  # permissions are cached on the user
+        queries = []
+        for n_seconds in (2, 10):
+            approval = UnrestrictedApproval.create()
+            for _ in range(n_seconds + 1):  # first, then n_seconds second signoffs
+                approval.next_signoffs(for_user=u)[0].sign(u)
+            approval.next_signoffs(for_user=u)[-1].sign(u)
+            approval = UnrestrictedApproval.stampModel.objects.get(pk=approval.stamp.pk).approval
+            with CaptureQueriesContext(connection) as captured:
+                approval.revoke(u)
+            self.assertEqual(approval.signatories.count(), 0)
+            self.assertEqual(
+                UnrestrictedApproval.second_signoff.get_revoked_signets_queryset()
+                .filter(stamp=approval.stamp).count(),
+                n_seconds,
+            )
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+
     def test_prefetch_signoffs_with_revoked(self):
         """Test that prefetched signoffs on an approval with revoked signets only prefetches the singed signets"""
         u = self.unrestricted_user
@@ -392,6 +638,15 @@ class StampModelTests(TestCase):
         p = Stamp(approval_id="signoffs.tests.my_approval")
         self.assertEqual(p.approval_type, a)
 
+    def test_trusted_save(self):
+        with mock.patch.object(Stamp, "full_clean") as full_clean:
+            Stamp(approval_id="signoffs.tests.my_approval").save(trusted=True)
+            full_clean.assert_not_called()
+            with self.assertRaises(exceptions.ValidationError):
+                Stamp(approval_id="not.a.valid.type").save(trusted=True)
+            Stamp(approval_id="signoffs.tests.my_approval").save()
+            full_clean.assert_called_once()
+
     def test_invalid_approval_type(self):
         p = Stamp(approval_id="not.a.valid.type")
         with self.assertRaises(exceptions.ImproperlyConfigured):
@@ -438,6 +693,30 @@ class StampQuerysetTests(TestCase):
         approvals = UnrestrictedApproval.get_stamp_queryset().approvals()
         self.assertQuerySetEqual(approvals, self.approval_set1)
 
+    def test_qs_iter_approvals(self):
+        qs = Stamp.objects.order_by("pk").prefetch_signets()
+        with self.assertNumQueries(4):  # one for the stamps, one prefetch per chunk
+            approvals = list(qs.iter_approvals(chunk_size=2))
+            self.assertTrue(all(a.signatories.count() == 0 for a in approvals))
+        self.assertQuerySetEqual(approvals, self.all_approvals)
+        self.assertQuerySetEqual(
+            qs.iter_approvals(approval_id=LeaveApproval.id), self.approval_set2
+        )
+
+    def test_qs_approval_views(self):
+        self.approval_set1[0].approve()
+        self.approval_set1[0].save()
+        with self.assertNumQueries(1):
+            views = Stamp.objects.order_by("pk").approval_views(approval_id=UnrestrictedApproval.id)
+        self.assertEqual(len(views), len(self.approval_set1))
+        for view, approval in zip(views, self.approval_set1):
+            self.assertFalse(hasattr(view, "__dict__"))
+            self.assertEqual(view.id, approval.stamp.pk)
+            self.assertEqual(view.is_approved(), approval.is_approved())
+            self.assertEqual(view.timestamp, approval.stamp.timestamp)
+            self.assertIs(view.approval_type, UnrestrictedApproval)
+            self.assertEqual(view.get_approval(), approval)
+
     def test_qs_approvals_filter(self):
         base_qs = Stamp.objects.order_by("pk")
         self.assertQuerySetEqual(
@@ -455,3 +734,67 @@ class StampQuerysetTests(TestCase):
             approvals2 = base_qs.approvals(approval_id=LeaveApproval.id)
             self.assertEqual(len(approvals2), len(self.approval_set2))
             self.assertEqual(len(base_qs.approvals()), len(self.all_approvals))
+
+    def test_evaluate_many(self):
+        a1, a2 = self.approval_set1
+        u = fixtures.get_user(username="signing", perms=("some_perm",))
+        UnrestrictedApproval.first_signoff(stamp=a1.stamp).sign(user=u)
+        signing_order = UnrestrictedApproval.signing_order
+        with self.assertNumQueries(1):
+            states = signing_order.evaluate_many([a.stamp for a in self.approval_set1])
+        self.assertEqual(
+            states[a1.stamp.pk], (False, [UnrestrictedApproval.second_signoff])
+        )
+        self.assertEqual(
+            states[a2.stamp.pk], (False, [UnrestrictedApproval.first_signoff])
+        )
+        self.assertEqual(states[a1.stamp.pk].next, a1.next_signoff_types())
+
+    def test_with_signing_order_state(self):
+        a1 = self.approval_set2[0]
+        a1.employee_signoff_type(stamp=a1.stamp).sign(user=self.user)
+        with self.assertNumQueries(2):
+            stamps = Stamp.objects.order_by("pk").with_signing_order_state()
+        self.assertEqual(len(stamps), len(self.all_approvals))
+        for stamp, approval in zip(stamps, self.all_approvals):
+            self.assertEqual(
+                stamp.signing_order_status,
+                (approval.is_complete(), approval.next_signoff_types()),
+            )
+
+
+class SigningOrderWarmUpTests(SimpleTestCase):
+    def test_compile_signing_orders(self):
+        reports = so.compile_signing_orders()
+        report = {r.approval_id: r for r in reports}[UnrestrictedApproval.id]
+        self.assertEqual(report.backend, "regex")
+        self.assertEqual(
+            report.size,
+            len(
+                UnrestrictedApproval.signing_order.pattern.regex_pattern(
+                    UnrestrictedApproval.signing_order.pattern.token_alphabet
+                ).regex
+            ),
+        )
+        self.assertIn("pattern_matcher", UnrestrictedApproval.signing_order.pattern.__dict__)
+
+    def test_compile_signing_orders_fresh(self):
+        so.compile_signing_orders()  # warm up
+        backend = type(UnrestrictedApproval.signing_order.pattern.matcher_backend)
+        with mock.patch.object(backend, "compile", autospec=True, side_effect=backend.compile) as compile:
+            so.compile_signing_orders()
+            compile.assert_not_called()
+            reports = so.compile_signing_orders(fresh=True)
+        self.assertTrue(compile.called)
+        self.assertFalse(any(r.cached for r in reports))
+
+    def test_warm_up_logs(self):
+        with self.assertLogs("signoffs.core.signing_order.signing_order", "INFO") as logs:
+            so.warm_up_signing_orders()
+        self.assertTrue(any(UnrestrictedApproval.id in line for line in logs.output))
+
+    def test_signing_order_report_command(self):
+        out = StringIO()
+        call_command("signing_order_report", sort="size", stdout=out)
+        self.assertIn(UnrestrictedApproval.id, out.getvalue())
+        self.assertIn(PersistedStateApproval.id, out.getvalue())
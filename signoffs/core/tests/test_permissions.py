@@ -0,0 +1,86 @@
+"""
+Test suite for the request-scoped permission cache
+"""
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase
+
+from signoffs.core import permissions
+from signoffs.core.approvals import ApprovalLogic
+from signoffs.core.signoffs import SignoffLogic
+
+
+def get_user(pk=1, granted=("auth.some_perm",)):
+    return SimpleNamespace(
+        pk=pk,
+        id=pk,
+        has_perm=mock.Mock(side_effect=lambda perm: perm in granted),
+        get_all_permissions=mock.Mock(return_value=set(granted)),
+    )
+
+
+class PermissionCacheTests(SimpleTestCase):
+    def test_no_active_cache(self):
+        user = get_user()
+        self.assertIsNone(permissions.get_permission_cache())
+        logic = SignoffLogic(perm="auth.some_perm")
+        for _ in range(3):
+            self.assertTrue(logic.is_permitted_signer(None, user))
+        self.assertEqual(user.has_perm.call_count, 3)
+
+    def test_logic_uses_cache(self):
+        user, other_user = get_user(), get_user(pk=2, granted=())
+        signoff_logic = SignoffLogic(perm="auth.some_perm", revoke_perm="auth.other_perm")
+        approval_logic = ApprovalLogic(revoke_perm="auth.some_perm")
+        with permissions.permission_cache() as cache:
+            for _ in range(3):
+                self.assertTrue(signoff_logic.is_permitted_signer(None, user))
+                self.assertFalse(signoff_logic.is_permitted_revoker(None, user))
+                self.assertTrue(approval_logic.is_permitted_revoker(None, user))
+                self.assertFalse(signoff_logic.is_permitted_signer(None, other_user))
+            self.assertEqual(len(cache), 3)
+        self.assertEqual(user.has_perm.call_count, 2)
+        self.assertEqual(other_user.has_perm.call_count, 1)
+        self.assertIsNone(permissions.get_permission_cache())
+
+    def test_unsaved_user_not_cached(self):
+        user = get_user(pk=None)
+        with permissions.permission_cache() as cache:
+            cache.has_perm(user, "auth.some_perm")
+            cache.has_perm(user, "auth.some_perm")
+        self.assertEqual(user.has_perm.call_count, 2)
+
+    def test_batch_fill(self):
+        user = get_user(granted=("auth.a", "auth.b"))
+        cache = permissions.PermissionCache()
+        self.assertEqual(
+            cache.has_perms(user, ["auth.a", "auth.b", "auth.c"]),
+            {"auth.a": True, "auth.b": True, "auth.c": False},
+        )
+        user.get_all_permissions.assert_called_once()
+        user.has_perm.assert_called_once_with("auth.c")  # only perms not granted are checked one by one
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_batch_fill_without_all_permissions(self):
+        user = get_user(granted=("auth.a",))
+        del user.get_all_permissions  # e.g., a custom user model without PermissionsMixin
+        cache = permissions.PermissionCache()
+        self.assertEqual(cache.has_perms(user, ["auth.a", "auth.b"]), {"auth.a": True, "auth.b": False})
+        self.assertEqual(user.has_perm.call_count, 2)
+
+    def test_middleware(self):
+        caches = []
+
+        def get_response(request):
+            caches.append(permissions.get_permission_cache())
+            return "response"
+
+        middleware = permissions.PermissionCacheMiddleware(get_response)
+        request = RequestFactory().get("/")
+        self.assertEqual(middleware(request), "response")
+        middleware(request)
+        self.assertIsInstance(caches[0], permissions.PermissionCache)
+        self.assertIsNot(caches[0], caches[1])  # a new cache for each request
+        self.assertIsNone(permissions.get_permission_cache())
@@ -2,13 +2,19 @@
 App-independent tests for Signoff model descriptors - no app logic
 """
 
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MultipleObjectsReturned
+from django.core.management import call_command
 from django.test import TestCase
 
 from signoffs.core.forms import AbstractSignoffForm
+from signoffs.core.signoffs import sign_signoff
 
 from . import fixtures
-from .models import InvalidModel, LeaveRequest, Signet
+from .models import InvalidModel, LeaveRequest, LeaveSignet, Signet
 
 
 class SimpleSignoffRelationTests(TestCase):
@@ -101,6 +107,12 @@ class SignoffRelationTests(TestCase):
         with self.assertNumQueries(2):
             self.assertTrue(all(s.is_signed() for s in lr.hr_signoffs.all()))
 
+    def test_signoffset_revoked_flag(self):
+        lr = LeaveRequest.objects.get(pk=self.lr.pk)
+        self.hr_signoffs[0].revoke(user=self.u1)
+        with self.assertNumQueries(1):  # revoked state is annotated, rather than queried for each signoff
+            self.assertEqual([(s.is_signed(), s.is_revoked()) for s in lr.hr_signoffs.all()], [(True, False)])
+
     def test_signoffset_queries(self):
         with self.assertNumQueries(2):
             lr = LeaveRequest.objects.prefetch_related("signatories").get(pk=self.lr.pk)
@@ -118,6 +130,88 @@ class SignoffRelationTests(TestCase):
             self.assertTrue(lr.hr_signoffs.has_signed(self.u1))
             self.assertFalse(lr.hr_signoffs.has_signed(self.u3))
 
+    def test_signoffset_bulk_create(self):
+        users = [fixtures.get_user() for _ in range(5)]
+        lr = LeaveRequest.objects.get(pk=self.lr.pk)
+        signoffs = lr.hr_signoffs.bulk_create(users)
+        self.assertEqual(len(signoffs), 5)
+        self.assertTrue(all(s.signet.object == lr for s in signoffs))
+        self.assertEqual(lr.hr_signoffs.count(), 7)
+        self.assertTrue(all(lr.hr_signoffs.has_signed(u) for u in users))
+
+    def test_signoffset_counter(self):
+        lr = LeaveRequest.objects.get(pk=self.lr.pk)
+        self.assertEqual(lr.hr_signoff_count, 2)
+        signoff = lr.hr_signoffs.create(user=self.u3)
+        lr.save()  # saving a stale counter doesn't overwrite it
+        lr.refresh_from_db(fields=["hr_signoff_count"])
+        self.assertEqual(lr.hr_signoff_count, 3)
+        signoff.revoke(user=self.u3)
+        lr.hr_signoffs.bulk_create([fixtures.get_user() for _ in range(2)])
+        lr.refresh_from_db(fields=["hr_signoff_count"])
+        self.assertEqual(lr.hr_signoff_count, 4)
+        lr.hr_signoffs.signet_set.filter(signoff_id=LeaveRequest.hr_signoff_type.id).revoke(self.u1)
+        lr.refresh_from_db(fields=["hr_signoff_count"])
+        self.assertEqual(lr.hr_signoff_count, 0)
+
+    def test_signoffset_counter_custom_sign_method(self):
+        def sign_with_label(signoff, user, commit=True, **kwargs):
+            sign_signoff(signoff, user, commit=False)
+            signoff.signet.sigil_label = "Custom"
+            if commit:
+                signoff.save(**kwargs)
+            return signoff
+
+        signoff_type = LeaveRequest.hr_signoff_type
+        with mock.patch.object(signoff_type.logic, "sign_method", sign_with_label):
+            signoff_type(object=self.lr).sign(user=self.u3)
+        self.assertEqual(LeaveRequest.objects.get(pk=self.lr.pk).hr_signoff_count, 3)
+
+    def test_signoffset_counter_revoke_revoked(self):
+        signoff = self.hr_signoffs[0]
+        signoff.revoke(user=self.u1)
+        LeaveSignet.all_signets.get(pk=signoff.signet.pk).signoff.revoke(user=self.u1)  # forced revoke
+        lr = LeaveRequest.objects.get(pk=self.lr.pk)
+        self.assertEqual(lr.hr_signoff_count, 1)
+        LeaveSignet.all_signets.filter(object=lr).revoke(self.u1)  # includes the revoked signet
+        lr.refresh_from_db(fields=["hr_signoff_count"])
+        self.assertEqual(lr.hr_signoff_count, 0)
+
+    def test_signoffset_counter_reconcile(self):
+        LeaveRequest.objects.update(hr_signoff_count=42)
+        out = StringIO()
+        call_command("signoffs_reconcile_counters", "signoffs.LeaveRequest", stdout=out)
+        self.assertIn("signoffs.LeaveRequest.hr_signoff_count", out.getvalue())
+        self.assertEqual(LeaveRequest.objects.get(pk=self.lr.pk).hr_signoff_count, 2)
+        self.assertEqual(LeaveRequest.objects.create().hr_signoff_count, 0)
+
+    def test_signoff_get_many(self):
+        mngmt_signoff = LeaveRequest.mngmt_signoff_type
+        requests = [self.lr] + [LeaveRequest.objects.create() for _ in range(3)]
+        with self.assertNumQueries(1):
+            signoffs = mngmt_signoff.get_many(requests)
+            self.assertEqual(list(signoffs), requests)
+            self.assertTrue(signoffs[self.lr].is_signed())
+            self.assertIs(signoffs[self.lr].signet.object, self.lr)
+            self.assertTrue(all(not signoffs[lr].is_signed() for lr in requests[1:]))
+            self.assertIs(signoffs[requests[1]].subject, requests[1])
+        self.assertEqual(signoffs[requests[1]].signet.object, requests[1])
+
+        signoffs = mngmt_signoff.get_many([{"object_id": lr.pk} for lr in requests], key=str)
+        self.assertEqual(list(signoffs), [str(lr.pk) for lr in requests])
+        self.assertEqual(signoffs[str(self.lr.pk)].signatory, self.u3)
+
+        queryset = LeaveSignet.objects.filter(user=self.u1)
+        with self.assertNumQueries(1):  # the given queryset is filtered, not evaluated
+            signoffs = mngmt_signoff.get_many(requests, queryset=queryset)
+        self.assertFalse(signoffs[self.lr].is_signed())
+
+        with self.assertRaises(MultipleObjectsReturned):
+            LeaveRequest.hr_signoff_type.get_many([self.lr])
+        with self.assertRaises(ValueError):
+            mngmt_signoff.get_many([{"object": self.lr}, {"user": self.u1}])
+        self.assertEqual(mngmt_signoff.get_many([]), {})
+
     def test_signoffset_form(self):
         lr = LeaveRequest.objects.prefetch_related("signatories").get(pk=self.lr.pk)
         form = lr.hr_signoffs.forms.get_signoff_form_class()
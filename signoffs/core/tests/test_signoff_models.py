@@ -1,15 +1,42 @@
 """
 App-independent tests for Signoff models - no app logic
 """
+import csv
+import gzip
+import json
+import os
+import tempfile
+import tracemalloc
+import types
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.core import exceptions
-from django.test import SimpleTestCase, TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from signoffs import registry
+from signoffs.core.models import signets
+from signoffs.core.signoffs import sign_signoff
 from signoffs.signoffs import SignoffLogic
 
 from . import fixtures
-from .models import BasicSignoff, OtherSignet, Signet, simple_revokable_signoff_type
+from .models import (
+    BasicSignoff,
+    LeaveApproval,
+    LeaveRequest,
+    OtherSignet,
+    OtherStamp,
+    Signet,
+    Stamp,
+    simple_revokable_signoff_type,
+)
 
 signoff1 = BasicSignoff.register(id="test.signoff1")
 signoff2 = BasicSignoff.register(
@@ -21,6 +48,20 @@ signoff2 = BasicSignoff.register(
 signoff3 = BasicSignoff.register(id="test.signoff3")
 
 
+def sign_with_label(signoff, user, commit=True, **kwargs):
+    """A custom sign_method that labels the signature"""
+    sign_signoff(signoff, user, commit=False)
+    signoff.signet.sigil_label = "Custom"
+    if commit:
+        signoff.save(**kwargs)
+    return signoff
+
+
+custom_sign_signoff = BasicSignoff.register(
+    id="test.custom_sign_signoff", logic=SignoffLogic(sign_method=sign_with_label)
+)
+
+
 class SimpleSignoffTypeTests(SimpleTestCase):
     def test_signoff_type_relations(self):
         signoff_type = registry.signoffs.get("test.signoff1")
@@ -49,6 +90,42 @@ class SignoffTypeIntheritanceTests(SimpleTestCase):
         self.assertEqual(s.signet_model, OtherSignet)
 
 
+class RegistryIndexTests(SimpleTestCase):
+    def test_by_model(self):
+        self.assertIn(signoff1, registry.signoffs.by_signet_model(Signet))
+        self.assertNotIn(signoff2, registry.signoffs.by_signet_model(Signet))
+        self.assertIn(signoff2, registry.signoffs.by_signet_model("signoffs.OtherSignet"))
+        self.assertIn(
+            simple_revokable_signoff_type,
+            registry.signoffs.by_revoke_model(simple_revokable_signoff_type.get_revokeModel()),
+        )
+        self.assertEqual(registry.signoffs.by_revoke_model(OtherSignet), ())
+        self.assertIn("signoffs.othersignet", registry.signoffs.indexed_models("signetModel"))
+
+    def test_with_id_prefix(self):
+        self.assertEqual(registry.signoffs.with_id_prefix("test.signoff1"), [signoff1])
+        self.assertTrue({signoff1, signoff2, signoff3} <= set(registry.signoffs.with_id_prefix("test.signoff")))
+        self.assertTrue({signoff1, signoff2, signoff3} <= set(registry.signoffs.with_id_prefix("test.")))
+        self.assertNotIn(signoff1, registry.signoffs.with_id_prefix("test.signoffs"))
+        self.assertEqual(registry.signoffs.with_id_prefix("no.such.prefix"), [])
+
+    def test_approvals_by_stamp_model(self):
+        self.assertIn(LeaveApproval, registry.approvals.by_stamp_model(Stamp))
+        self.assertNotIn(LeaveApproval, registry.approvals.by_stamp_model(OtherStamp))
+        self.assertEqual(registry.approvals.with_id_prefix(LeaveApproval.id), [LeaveApproval])
+
+    def test_frozen_indexes(self):
+        types = registry.SignoffTypes()
+        a, b = type("A", (BasicSignoff,), {"id": "index.a"}), type("B", (BasicSignoff,), {"id": "index.b"})
+        types.register(a)
+        types.freeze()
+        index = types.by_signet_model(Signet)
+        types.register(b)
+        self.assertEqual(index, (a,))  # late registrations replace, rather than modify, frozen indexes
+        self.assertEqual(types.by_signet_model(Signet), (a, b))
+        self.assertEqual(types.with_id_prefix("index."), [a, b])
+
+
 class SignoffTypeTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -120,6 +197,64 @@ class SignoffTypeTests(TestCase):
         so = signoff2.create(user=self.signing_user)
         self.assertEqual(so.signet.sigil, self.signing_user.get_full_name())
 
+    def test_trusted_save(self):
+        with mock.patch.object(Signet, "full_clean") as full_clean:
+            so = signoff1(user=self.signing_user).save(trusted=True)
+            full_clean.assert_not_called()
+            self.assertTrue(so.is_signed())
+            with self.assertRaises(exceptions.PermissionDenied):  # invariants are still checked
+                so.signet.save(trusted=True)  # can't re-save a signed signet
+            with mock.patch.object(signets.settings, "SIGNOFFS_TRUSTED_SAVES", True):
+                signoff1(user=self.signing_user).save()
+            full_clean.assert_not_called()
+            signoff1(user=self.signing_user).save()
+            full_clean.assert_called_once()
+
+    def test_bulk_sign(self):
+        users = [self.signing_user, self.unrestricted_user] * 3
+        for u in (self.signing_user, self.unrestricted_user):
+            u.get_all_permissions()  # permissions are cached on the user
+        with CaptureQueriesContext(connection) as queries:
+            signoffs = signoff2.bulk_sign(users, batch_size=4)
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(len(signoffs), 6)
+        self.assertTrue(all(s.signet.is_signed() for s in signoffs))
+        self.assertEqual([s.signatory for s in signoffs], users)
+        self.assertEqual(signoffs[0].signet.sigil, self.signing_user.get_full_name())
+        self.assertEqual(OtherSignet.objects.filter(signoff_id=signoff2.id).count(), 6)
+
+    def test_bulk_sign_signets(self):
+        signets = [OtherSignet(signoff_id=signoff2.id, user=self.signing_user, sigil="Signed")]
+        signoffs = signoff2.bulk_sign(signets)
+        self.assertIs(signoffs[0].signet, signets[0])
+        self.assertEqual(OtherSignet.objects.get().sigil, "Signed")
+
+    def test_bulk_sign_not_permitted(self):
+        with self.assertRaises(exceptions.PermissionDenied):
+            signoff2.bulk_sign([self.signing_user, self.restricted_user])
+        self.assertFalse(OtherSignet.objects.exists())
+
+    def test_bulk_sign_already_signed(self):
+        signoff = signoff2(user=self.signing_user)
+        signoff.save()
+        with self.assertRaisesMessage(exceptions.PermissionDenied, "Attempt to sign signed Signet"):
+            signoff2.bulk_sign([signoff.signet])
+
+    def test_bulk_sign_custom_sign_method(self):
+        signoffs = custom_sign_signoff.bulk_sign([self.signing_user, self.unrestricted_user])
+        self.assertTrue(all(s.is_signed() for s in signoffs))
+        self.assertEqual(
+            list(Signet.objects.filter(signoff_id=custom_sign_signoff.id).values_list("sigil_label", flat=True)),
+            ["Custom", "Custom"],
+        )
+
+    def test_bulk_sign_no_commit(self):
+        signoffs = signoff2.bulk_sign([self.signing_user], commit=False)
+        self.assertFalse(signoffs[0].signet.is_signed())
+        self.assertTrue(signoffs[0].signet.sigil)
+        self.assertFalse(OtherSignet.objects.exists())
+
 
 class SignoffQuerysetTests(TestCase):
     @classmethod
@@ -238,6 +373,10 @@ class SignoffQuerysetTests(TestCase):
             self.assertTrue(all(s.is_signed() for s in reload))
 
 
+def quacker_defaults(signet):
+    return {"sigil": "Quack"}
+
+
 class SignetModelTests(SimpleTestCase):
     def test_default_signature(self):
         u = get_user_model()(username="daffyduck")
@@ -247,6 +386,28 @@ class SignetModelTests(SimpleTestCase):
         o = Signet(signoff_id="test.signoff1", user=u)
         self.assertEqual(o.get_signet_defaults()["sigil"], "Daffy Duck")
 
+    def test_signet_defaults_setting(self):
+        u = get_user_model()(username="daffyduck")
+        o = Signet(signoff_id="test.signoff1", user=u)
+        with override_settings(SIGNOFFS_SIGNET_DEFAULTS={"sigil": "Duck"}):
+            self.assertEqual(o.get_signet_defaults(), {"sigil": "Duck"})
+        self.assertEqual(o.get_signet_defaults()["sigil"], "daffyduck")
+        path = f"{__name__}.quacker_defaults"
+        with override_settings(SIGNOFFS_SIGNET_DEFAULTS=path), mock.patch.object(
+            signets, "dynamic_import", wraps=signets.dynamic_import
+        ) as dynamic_import:
+            self.assertEqual(o.get_signet_defaults()["sigil"], "Quack")
+            self.assertEqual(o.get_signet_defaults()["sigil"], "Quack")
+            dynamic_import.assert_called_once_with(path)
+
+    def test_signet_defaults_per_model(self):
+        self.addCleanup(signets.signet_defaults_providers.clear)
+        with mock.patch.object(OtherSignet, "signet_defaults", quacker_defaults):
+            signets.signet_defaults_providers.clear()
+            u = get_user_model()(username="daffyduck")
+            self.assertEqual(OtherSignet(user=u).get_signet_defaults()["sigil"], "Quack")
+            self.assertEqual(Signet(user=u).get_signet_defaults()["sigil"], "daffyduck")
+
     def test_valid_signoff_type(self):
         s = registry.signoffs.get("test.signoff1")
         o = Signet(signoff_id="test.signoff1")
@@ -300,9 +461,118 @@ class SignetQuerysetTests(TestCase):
             base_qs.signoffs(signoff_id="test.signoff3"), self.signoff3_set
         )
 
+    def test_qs_iter_signoffs(self):
+        base_qs = Signet.objects.order_by("pk")
+        signoffs = base_qs.iter_signoffs(signoff_id="test.signoff3", chunk_size=2)
+        self.assertIsInstance(signoffs, types.GeneratorType)
+        with self.assertNumQueries(1):  # signing users and revoke receipts are joined
+            signoffs = list(signoffs)
+            self.assertTrue(all(s.is_signed() and s.signatory == self.user for s in signoffs))
+        self.assertQuerySetEqual(signoffs, self.signoff3_set)
+        self.assertQuerySetEqual(base_qs.iter_signoffs(), self.all_signoffs)
+        self.assertIsNone(base_qs._result_cache)
+
+    def test_qs_iter_signoffs_no_revoke_model(self):
+        signet = OtherSignet.objects.create(signoff_id=signoff2.id, user=self.user)
+        signoffs = list(OtherSignet.objects.iter_signoffs())
+        self.assertEqual([s.signet for s in signoffs], [signet])
+        self.assertFalse(signoffs[0].is_revoked())
+
+    def test_qs_signoffs_sql_filter(self):
+        base_qs = Signet.objects.all().order_by("pk")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertQuerySetEqual(
+                base_qs.signoffs(signoff_id="test.signoff1"), self.signoff1_set
+            )
+        self.assertEqual(len(queries), 1)
+        self.assertIn("signoff_id", queries[0]["sql"].split("WHERE")[-1])
+        self.assertIsNone(base_qs._result_cache)
+        # sliced querysets can't be filtered, so are filtered in-memory
+        self.assertQuerySetEqual(
+            base_qs[:3].signoffs(signoff_id="test.signoff3"), self.signoff3_set[:1]
+        )
+
+    def test_qs_revoke(self):
+        revokable = [simple_revokable_signoff_type.create(user=self.user) for _ in range(3)]
+        qs = Signet.objects.filter(
+            signoff_id__in=(simple_revokable_signoff_type.id, "test.signoff1")
+        )
+        with CaptureQueriesContext(connection) as queries:
+            receipts = qs.revoke(self.user, reason="Bulk")
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 2)  # one for all restored signets, one for all receipts
+        self.assertEqual(len(receipts), len(revokable))
+        self.assertTrue(all(r.reason == "Bulk" and r.user == self.user for r in receipts))
+        self.assertFalse(qs.exists())
+        # revokable signets are kept, with their receipts, others are simply deleted
+        self.assertEqual(Signet.revoked_signets.count(), len(revokable))
+        self.assertFalse(Signet.all_signets.filter(signoff_id="test.signoff1").exists())
+        self.assertEqual(Signet.objects.count(), len(self.signoff3_set))
+
+    def test_qs_with_revoked_flag(self):
+        signoffs = [simple_revokable_signoff_type.create(user=self.user) for _ in range(3)]
+        signoffs[0].revoke(self.user)
+        qs = simple_revokable_signoff_type.get_signet_queryset().order_by("pk")
+        with self.assertNumQueries(1):
+            flags = {signet.pk: signet.is_revoked() for signet in qs.with_revoked_flag()}
+        self.assertEqual(flags, {s.signet.pk: s is signoffs[0] for s in signoffs})
+        # a signet revoked after it was fetched is not mis-reported by its stale flag
+        signet = qs.with_revoked_flag().get(pk=signoffs[1].signet.pk)
+        self.assertFalse(signet.is_revoked())
+        signet.signoff.revoke(self.user)
+        self.assertTrue(signet.is_revoked())
+        # signets with no revoke model are never revoked
+        self.assertEqual(OtherSignet.objects.with_revoked_flag().query.annotations, {})
+        self.assertFalse(OtherSignet(signoff_id="test.signoff2").is_revoked())
+
+    def test_qs_signoff_views(self):
+        views = Signet.objects.order_by("pk").signoff_views(signoff_id="test.signoff3")
+        self.assertEqual(len(views), len(self.signoff3_set))
+        for view, signoff in zip(views, self.signoff3_set):
+            self.assertFalse(hasattr(view, "__dict__"))
+            self.assertEqual(view.id, signoff.signet.pk)
+            self.assertTrue(view.is_signed())
+            self.assertEqual(view.sigil, signoff.sigil)
+            self.assertEqual(view.timestamp, signoff.timestamp)
+            self.assertEqual(view.signatory, signoff.signatory)
+            self.assertIs(view.signoff_type, signoff3)
+            self.assertEqual(view.get_signoff(), signoff)
+        with self.assertRaises(AttributeError):
+            views[0].sigil = "Forged"
+
+    def test_qs_signoff_views_revoked(self):
+        signoff = simple_revokable_signoff_type.create(user=self.user)
+        signoff.revoke(self.user)
+        (view,) = simple_revokable_signoff_type.get_signet_queryset().signoff_views()
+        self.assertTrue(view.is_revoked())
+        self.assertFalse(view.is_signed())
+        self.assertIsNone(view.sigil)
+        self.assertIsNone(view.sigil_label)
+        self.assertEqual((view.sigil, view.sigil_label), (signoff.sigil, signoff.sigil_label))
+
+    def test_qs_signoff_views_memory(self):
+        for _ in range(100):
+            signoff1.create(user=self.user)
+        qs = Signet.objects.filter(signoff_id="test.signoff1")
+
+        def retained(listing):
+            """Return the memory retained by the list of objects returned by listing"""
+            listing()  # warm up query compilation, etc.
+            tracemalloc.start()
+            objects = listing()
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del objects
+            return size
+
+        signoffs_size = retained(lambda: [(s, s.render, s.urls) for s in qs.all().signoffs()])
+        views_size = retained(lambda: qs.all().signoff_views())
+        self.assertLess(views_size * 5, signoffs_size)
+
     def test_qs_signoffs_performance(self):
         base_qs = Signet.objects.all().order_by("pk")
         with self.assertNumQueries(1):
+            self.assertEqual(len(base_qs), len(self.all_signoffs))  # evaluated qs is filtered in-memory
             signoffs1 = base_qs.signoffs(signoff_id="test.signoff1")
             self.assertEqual(len(signoffs1), len(self.signoff1_set))
             signoffs2 = base_qs.signoffs(signoff_id="test.signoff2")
@@ -310,3 +580,49 @@ class SignetQuerysetTests(TestCase):
             signoffs3 = base_qs.signoffs(signoff_id="test.signoff3")
             self.assertEqual(len(signoffs3), len(self.signoff3_set))
             self.assertEqual(len(base_qs.signoffs()), len(self.all_signoffs))
+
+
+class SignoffsExportCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = fixtures.get_user()
+        cls.signoff = simple_revokable_signoff_type.create(user=cls.user)
+        cls.revoked = simple_revokable_signoff_type.create(user=cls.user)
+        cls.revoked.revoke(cls.user, reason="Oops")
+        cls.lr = LeaveRequest.objects.create()
+        cls.hr_signoff = cls.lr.hr_signoffs.create(user=cls.user)
+
+    def export(self, *args, **options):
+        out = StringIO()
+        call_command("signoffs_export", *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_export_csv(self):
+        rows = list(csv.DictReader(StringIO(self.export(signoff_ids=[simple_revokable_signoff_type.id]))))
+        self.assertEqual([r["record"] for r in rows], ["signet", "signet", "revoked"])
+        self.assertEqual(rows[0]["id"], str(self.signoff.signet.pk))
+        self.assertEqual(rows[0]["sigil"], self.signoff.sigil)
+        self.assertEqual(rows[2]["signet_id"], str(self.revoked.signet.pk))
+        self.assertEqual(rows[2]["signoff_id"], simple_revokable_signoff_type.id)
+        self.assertEqual(rows[2]["reason"], "Oops")
+
+    def test_export_filters(self):
+        tomorrow = (timezone.now() + timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.export(format="jsonl", since=tomorrow), "")
+        self.assertEqual(len(self.export(format="jsonl", until=tomorrow).splitlines()), 4)
+        rows = [json.loads(line) for line in self.export(format="jsonl", subject=f"signoffs.LeaveRequest:{self.lr.pk}").splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], self.hr_signoff.signet.pk)
+        self.assertEqual(rows[0]["model"], "signoffs.LeaveSignet")
+        with self.assertRaises(CommandError):
+            self.export(subject="signoffs.LeaveRequest:0")
+
+    def test_export_gzip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "signets.jsonl.gz")
+            call_command("signoffs_export", format="jsonl", output=path, chunk_size=1)
+            with gzip.open(path, "rt") as f:
+                rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 4)
+        with self.assertRaises(CommandError):
+            self.export(gzip=True)
@@ -0,0 +1,88 @@
+import tempfile
+import time
+
+import regex
+from django.core.management.base import BaseCommand
+
+from signoffs import registry
+from signoffs.core.signing_order import compiled_cache
+from signoffs.core.signing_order.signing_order import (
+    SigningOrder,
+    compile_signing_orders,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile the signing order for every registered Approval Type and report compile time and size of each, "
+        "along with the min. and max. number of signoffs to complete it and whether it is ambiguous"
+    )
+
+    @staticmethod
+    def signing_order_patterns():
+        """Return the unique signing order patterns for all registered Approval Types"""
+        patterns = (getattr(a, "signing_order", None) for a in registry.approvals.values())
+        return list({id(so.pattern): so.pattern for so in patterns if isinstance(so, SigningOrder)}.values())
+
+    def benchmark(self, rounds):
+        """Report the cold-start time for a worker to compile vs. load every signing order from the compiled_cache"""
+        patterns = self.signing_order_patterns()
+        with tempfile.TemporaryDirectory() as default_dir:
+            cache_dir = compiled_cache.SIGNOFFS_SIGNING_ORDER_CACHE_DIR or default_dir
+            for pattern in patterns:
+                compiled_cache.save(pattern, pattern.matcher_backend.compile(pattern), cache_dir)
+            compile_time = load_time = 0.0
+            for _ in range(rounds):
+                regex.purge()  # a new worker starts with an empty regex cache
+                start = time.perf_counter()
+                for pattern in patterns:
+                    pattern.matcher_backend.compile(pattern)
+                compile_time += time.perf_counter() - start
+                regex.purge()
+                start = time.perf_counter()
+                for pattern in patterns:
+                    compiled_cache.load(pattern, cache_dir)
+                load_time += time.perf_counter() - start
+        self.stdout.write(
+            f"Cold start for {len(patterns)} signing order patterns, mean of {rounds} rounds: "
+            f"compile {compile_time / rounds * 1000:.1f} ms, load from cache {load_time / rounds * 1000:.1f} ms"
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sort",
+            choices=["id", "time", "size"],
+            default="id",
+            help="Sort the report by approval id, compile time, or compiled size (largest first)",
+        )
+        parser.add_argument(
+            "--benchmark",
+            type=int,
+            metavar="ROUNDS",
+            default=0,
+            help="Also benchmark per-worker cold-start time, compiling vs. loading signing orders from the cache",
+        )
+
+    def handle(self, *args, **options):
+        regex.purge()  # signing orders are warmed up at startup - time a fresh compile of each
+        reports = compile_signing_orders(fresh=True)
+        if options["sort"] == "time":
+            reports.sort(key=lambda r: r.compile_time, reverse=True)
+        elif options["sort"] == "size":
+            reports.sort(key=lambda r: r.size, reverse=True)
+
+        self.stdout.write(
+            f"{'Approval Type':60} {'Backend':10} {'Compile (ms)':>12} {'Size':>10} {'Min':>5} {'Max':>5} "
+            f"{'Ambiguous':9} Cached"
+        )
+        for report in reports:
+            pattern = registry.approvals.get(report.approval_id).signing_order.pattern
+            analysis = pattern.analysis
+            max_length = "-" if analysis.max_length is None else analysis.max_length
+            self.stdout.write(
+                f"{report.approval_id:60} {report.backend:10} {report.compile_time * 1000:12.1f} {report.size:10d} "
+                f"{str(analysis.min_length):>5} {max_length:>5} {'yes' if analysis.is_ambiguous else 'no':9} "
+                f"{'yes' if compiled_cache.is_cached(pattern) else 'no'}"
+            )
+        if options["benchmark"]:
+            self.benchmark(options["benchmark"])
@@ -0,0 +1,195 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import dateparse, timezone
+
+from signoffs import registry
+
+FIELDS = (
+    "record",
+    "model",
+    "id",
+    "signoff_id",
+    "user_id",
+    "sigil",
+    "sigil_label",
+    "timestamp",
+    "signet_id",
+    "reason",
+)
+
+
+def parse_timestamp(value):
+    """Parse an ISO date or datetime command line argument - dates are midnight, naive times in current timezone"""
+    try:
+        parsed = dateparse.parse_datetime(value) or dateparse.parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise CommandError(f"Invalid date or datetime: {value}")
+    if not isinstance(parsed, datetime.datetime):
+        parsed = datetime.datetime.combine(parsed, datetime.time())
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_models():
+    """Return the unique signet models and revoke models for all registered Signoff Types, each ordered by label"""
+    return (
+        [apps.get_model(label) for label in registry.signoffs.indexed_models("signetModel")],
+        [apps.get_model(label) for label in registry.signoffs.indexed_models("revokeModel")],
+    )
+
+
+def subject_relation(model, subject):
+    """Return name of model's FK to subject's model, or None if it has no such relation"""
+    relations = model.get_object_relations(type(subject))
+    return relations[0].name if relations else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every signet and revoke receipt, for all registered Signoff Types, as CSV or JSON Lines - "
+        "rows are streamed from the DB (server-side cursors, where supported) and written in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=["csv", "jsonl"], default="csv", help="Output format (default: csv)"
+        )
+        parser.add_argument(
+            "--output", "-o", metavar="PATH", help="Write to file at PATH, rather than stdout"
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Compress the output file with gzip (implied by an output PATH ending in .gz)",
+        )
+        parser.add_argument(
+            "--signoff-id",
+            action="append",
+            dest="signoff_ids",
+            metavar="ID",
+            help="Only export signets for the given Signoff Type id (may be repeated)",
+        )
+        parser.add_argument(
+            "--since", help="Only export records timestamped at or after this date / datetime"
+        )
+        parser.add_argument(
+            "--until", help="Only export records timestamped before this date / datetime"
+        )
+        parser.add_argument(
+            "--subject",
+            metavar="APP_LABEL.MODEL:PK",
+            help="Only export signets related to the given object - signet models with no relation to it are skipped",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000, help="Number of rows fetched and written at a time"
+        )
+
+    def get_subject(self, label):
+        """Return the object identified by a APP_LABEL.MODEL:PK label"""
+        try:
+            model_label, pk = label.split(":", 1)
+            model = apps.get_model(model_label)
+        except (ValueError, LookupError) as e:
+            raise CommandError(f"Invalid subject {label}: {e}") from e
+        try:
+            return model._default_manager.get(pk=pk)
+        except (model.DoesNotExist, ValueError, ValidationError) as e:
+            raise CommandError(f"Subject {label} not found") from e
+
+    def get_filters(self, signet_model, subject, options):
+        """Return filters to select signets of signet_model, or None if no such signets can be selected"""
+        filters = {}
+        if options["signoff_ids"]:
+            filters["signoff_id__in"] = options["signoff_ids"]
+        if subject is not None:
+            relation = subject_relation(signet_model, subject)
+            if relation is None:
+                return None
+            filters[relation] = subject
+        return filters
+
+    def get_querysets(self, options):
+        """Generate (record type, model, values queryset) for each model to export, with filters applied"""
+        subject = self.get_subject(options["subject"]) if options["subject"] else None
+        time_filters = {}
+        if options["since"]:
+            time_filters["timestamp__gte"] = parse_timestamp(options["since"])
+        if options["until"]:
+            time_filters["timestamp__lt"] = parse_timestamp(options["until"])
+        signet_models, revoke_models = export_models()
+        for signet_model in signet_models:
+            filters = self.get_filters(signet_model, subject, options)
+            if filters is not None:
+                signets = signet_model.all_signets.filter(**filters, **time_filters)
+                yield "signet", signet_model, signets.order_by("pk").values(
+                    "id", "signoff_id", "user_id", "sigil", "sigil_label", "timestamp"
+                )
+        for revoke_model in revoke_models:
+            filters = self.get_filters(revoke_model.signet.field.related_model, subject, options)
+            if filters is not None:
+                receipts = revoke_model._default_manager.filter(
+                    **{f"signet__{k}": v for k, v in filters.items()}, **time_filters
+                )
+                yield "revoked", revoke_model, receipts.order_by("pk").values(
+                    "id", "signet_id", "user_id", "timestamp", "reason", signoff_id=F("signet__signoff_id")
+                )
+
+    def open_output(self, options):
+        """Return a text stream for the output and a callable to close it"""
+        path = options["output"]
+        compress = options["gzip"] or (path or "").endswith(".gz")
+        if path is None:
+            if compress:
+                raise CommandError("--gzip requires an --output file")
+            return self.stdout, lambda: None
+        stream = gzip.open(path, "wt", newline="") if compress else open(path, "w", newline="")
+        return stream, stream.close
+
+    def format_chunk(self, rows, fmt):
+        """Return the given rows formatted as one block of text"""
+        buffer = io.StringIO()
+        if fmt == "csv":
+            writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+            for row in rows:
+                writer.writerow({k: v.isoformat() if hasattr(v, "isoformat") else v for k, v in row.items()})
+        else:
+            for row in rows:
+                buffer.write(json.dumps(row, cls=DjangoJSONEncoder))
+                buffer.write("\n")
+        return buffer.getvalue()
+
+    def handle(self, *args, **options):
+        fmt, chunk_size = options["format"], options["chunk_size"]
+        querysets = list(self.get_querysets(options))
+        output, close = self.open_output(options)
+        try:
+            if fmt == "csv":
+                output.write(",".join(FIELDS) + "\r\n")
+            for record, model, qs in querysets:
+                count = 0
+                rows = qs.iterator(chunk_size=chunk_size)
+                while chunk := list(islice(rows, chunk_size)):
+                    output.write(
+                        self.format_chunk(
+                            ({"record": record, "model": model._meta.label, **row} for row in chunk), fmt
+                        )
+                    )
+                    count += len(chunk)
+                if options["verbosity"] > 1:
+                    self.stderr.write(f"Exported {count} {record} records from {model._meta.label}")
+        finally:
+            close()
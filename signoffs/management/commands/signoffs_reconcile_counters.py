@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from signoffs.core.models.counters import signoff_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every SignoffCounter field from the signets it counts, in bulk - "
+        "repairs counters after signets are created or deleted outside of the signoffs API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models",
+            nargs="*",
+            metavar="APP_LABEL.MODEL",
+            help="Only reconcile counters on the given models (default: all)",
+        )
+
+    def handle(self, *args, **options):
+        labels = {label.lower() for label in options["models"]}
+        counters = [
+            counter
+            for signoff_id_counters in signoff_counters.values()
+            for counter in signoff_id_counters
+            if not labels or counter.model._meta.label_lower in labels
+        ]
+        for counter in sorted(counters, key=lambda c: (c.model._meta.label, c.name)):
+            updated = counter.reconcile()
+            self.stdout.write(f"{counter.model._meta.label}.{counter.name}: reconciled {updated} rows")
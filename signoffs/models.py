@@ -10,6 +10,7 @@ from signoffs.core.models import (
     AbstractApprovalStamp,
     AbstractRevokedSignet,
     AbstractSignet,
+    SigningOrderStateMixin,
 )
 from signoffs.core.models.fields import (
     ApprovalField,
@@ -19,6 +20,7 @@ from signoffs.core.models.fields import (
 from signoffs.core.models.fields import RelatedApprovalDescriptor as RelatedApproval
 from signoffs.core.models.fields import RelatedSignoffDescriptor as RelatedSignoff
 from signoffs.core.models.fields import SignoffField, SignoffSet, SignoffSingle
+from signoffs.core.models.counters import SignoffCounter
 
 if apps.is_installed("signoffs.contrib.signets"):
     from signoffs.contrib.signets.models import RevokedSignet, Signet
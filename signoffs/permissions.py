@@ -0,0 +1,12 @@
+"""
+    Proxy for the signoffs permission cache to simplify import statements and hide core package structure from client code.
+
+    isort:skip_file
+"""
+from signoffs.core.permissions import (
+    PermissionCache,
+    PermissionCacheMiddleware,
+    get_permission_cache,
+    has_perm,
+    permission_cache,
+)
@@ -18,11 +18,91 @@ __all__ = [
 ]
 
 
+def model_label(model) -> str | None:
+    """Return the lower-case "app_label.modelname" label for a Model class or "app_label.Model" label, or None"""
+    if not model:
+        return None
+    return model.lower() if isinstance(model, str) else model._meta.label_lower
+
+
 class ObjectRegistry(Registry):
-    """Generic base class for efficiently registering a bunch of objects that have an id attribute to use as name"""
+    """
+    Generic base class for efficiently registering a bunch of objects that have an id attribute to use as name
+
+    Registered objects are also indexed by each of the model attributes in index_attrs, and by id prefix.
+    Indexes are keyed by model label, so they can be built at registration, before models are loaded.
+    Once frozen (when the app is ready), indexes are replaced, never modified, by any later registration.
+    """
 
     object_type = object
     name_attr = "id"
+    index_attrs = ()  # names of attributes with a Model class or "app_label.Model" label to index objects by
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._frozen = False
+        self._indexes, self._id_trie = self._new_indexes()
+
+    def _new_indexes(self):
+        """Return a new, empty set of model indexes and id trie"""
+        return {attr: {} for attr in self.index_attrs}, ({}, [])
+
+    def _index(self, obj, indexes, id_trie):
+        """Add obj to the given indexes - trie nodes are (children, objects) tuples, keyed on dotted id segments"""
+        for attr, index in indexes.items():
+            label = model_label(getattr(obj, attr, None))
+            if label:
+                index.setdefault(label, []).append(obj)
+        node = id_trie
+        for segment in str(getattr(obj, self.name_attr)).split("."):
+            node = node[0].setdefault(segment, ({}, []))
+        node[1].append(obj)
+
+    def _build_indexes(self):
+        """Rebuild all indexes from scratch, replacing the current ones in one step"""
+        indexes, id_trie = self._new_indexes()
+        for obj in self.values():
+            self._index(obj, indexes, id_trie)
+        frozen_indexes = {
+            attr: {label: tuple(objs) for label, objs in index.items()} for attr, index in indexes.items()
+        }
+        self._indexes, self._id_trie = frozen_indexes, id_trie
+
+    def post_register(self, data, name):
+        """Index the newly registered object"""
+        if self._frozen:  # copy-on-write: threads reading a frozen index never see it change
+            self._build_indexes()
+        else:
+            self._index(self[name], self._indexes, self._id_trie)
+
+    def freeze(self):
+        """Compact indexes into immutable tuples - later registrations rebuild the indexes rather than modify them"""
+        self._build_indexes()
+        self._frozen = True
+
+    def get_indexed(self, attr, model) -> tuple:
+        """Return the registered objects whose attr is the given Model class or "app_label.Model" label"""
+        return tuple(self._indexes[attr].get(model_label(model), ()))
+
+    def indexed_models(self, attr) -> list[str]:
+        """Return the labels of all models indexed for attr, in sorted order"""
+        return sorted(self._indexes[attr])
+
+    def with_id_prefix(self, prefix: str) -> list:
+        """Return the registered objects whose id starts with given prefix (e.g., "myapp.approval."), ordered by id"""
+        *segments, partial = prefix.split(".")
+        node = self._id_trie
+        for segment in segments:
+            node = node[0].get(segment)
+            if node is None:
+                return []
+        found = []
+        stack = [child for segment, child in node[0].items() if segment.startswith(partial)]
+        while stack:
+            children, objs = stack.pop()
+            found.extend(objs)
+            stack.extend(children.values())
+        return sorted(found, key=lambda obj: getattr(obj, self.name_attr))
 
     def validate(self, data) -> bool:
         """Return True iff the data can is a unique, vaild candidate for storage in this registry"""
@@ -47,6 +127,7 @@ class SignoffTypes(ObjectRegistry):
     """Keep a reference to all Signoff Types"""
 
     look_into = "signoffs"
+    index_attrs = ("signetModel", "revokeModel")
 
     @property
     def object_type(self):
@@ -55,6 +136,14 @@ class SignoffTypes(ObjectRegistry):
 
         return signoffs.core.signoffs.AbstractSignoff
 
+    def by_signet_model(self, model) -> tuple[type[AbstractSignoff], ...]:
+        """Return the Signoff Types backed by the given Signet Model (class or "app_label.Model" label)"""
+        return self.get_indexed("signetModel", model)
+
+    def by_revoke_model(self, model) -> tuple[type[AbstractSignoff], ...]:
+        """Return the Signoff Types that record revoked signets with given Revoke Model (class or label)"""
+        return self.get_indexed("revokeModel", model)
+
 
 signoffs = SignoffTypes()
 """Singleton - the Signoff Types registry. `(see persisting_theory.Registry)`"""
@@ -81,6 +170,7 @@ class ApprovalTypes(ObjectRegistry):
     """Keep a reference to all Approval Types"""
 
     look_into = "approvals"
+    index_attrs = ("stampModel",)
 
     @property
     def object_type(self):
@@ -89,6 +179,10 @@ class ApprovalTypes(ObjectRegistry):
 
         return signoffs.core.approvals.AbstractApproval
 
+    def by_stamp_model(self, model) -> tuple[type[AbstractApproval], ...]:
+        """Return the Approval Types backed by the given Stamp Model (class or "app_label.Model" label)"""
+        return self.get_indexed("stampModel", model)
+
 
 approvals = ApprovalTypes()
 """Singleton - the Approval Types registry. `(see persisting_theory.Registry)`"""
@@ -12,4 +12,22 @@ SIGNOFFS_AUTODISCOVER_MODULE = getattr(
 # A dict that provides default values for mutable signet fields.
 SIGNOFFS_SIGNET_DEFAULTS = getattr(settings, "SIGNOFFS_SIGNET_DEFAULTS", None)
 
+# Max. number of signing order match results kept in the process-wide LRU cache - 0 or None disables the cache.
+SIGNOFFS_MATCH_CACHE_SIZE = getattr(settings, "SIGNOFFS_MATCH_CACHE_SIZE", 1024)
+
+# Name of the default pattern matching backend for signing orders: "regex" or "automaton", or any registered backend
+SIGNOFFS_SIGNING_ORDER_BACKEND = getattr(settings, "SIGNOFFS_SIGNING_ORDER_BACKEND", "regex")
+
+# Compile every registered approval's signing order when the app is ready, and log compile time and size of each.
+SIGNOFFS_WARM_UP_SIGNING_ORDERS = getattr(settings, "SIGNOFFS_WARM_UP_SIGNING_ORDERS", False)
+
+# Directory for the on-disk cache of compiled signing order patterns, shared by worker processes - None disables it.
+# Cache files are unpickled - the directory must only be writable by trusted processes.
+SIGNOFFS_SIGNING_ORDER_CACHE_DIR = getattr(settings, "SIGNOFFS_SIGNING_ORDER_CACHE_DIR", None)
+
+# Trusted saves skip full_clean() on signet and stamp saves, checking only the invariants signoffs relies on:
+# a registered signoff / approval id, and for signets, an unsigned signet with a user.
+# Default for saves that don't specify trusted=... - only enable if signets and stamps are never built from untrusted input.
+SIGNOFFS_TRUSTED_SAVES = getattr(settings, "SIGNOFFS_TRUSTED_SAVES", False)
+
 # SIGNOFFS_SETTING = getattr(settings, 'SIGNOFFS_SETTING', 'DEFAULT')
@@ -14,6 +14,7 @@ from signoffs.core.signing_order.signoff_pattern import (
     ExactlyOne,
     InParallel,
     InSeries,
+    Interleaved,
     OneOrMore,
     Optional,
     ZeroOrMore,
@@ -35,6 +35,7 @@ MIDDLEWARE = [
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "signoffs.permissions.PermissionCacheMiddleware",
 ]
 
 ROOT_URLCONF = "tests.test_app.urls"